@@ -1,10 +1,13 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-from app.routes import actions, recommend, generate
+from app.routes import actions, recommend, generate, admin, search
 from app.services.actions_loader import actions_loader
+from app.services.http_client import http_client
 from api_analytics.fastapi import Analytics
 from fastapi_mcp import FastApiMCP
 import os
@@ -30,7 +33,26 @@ logger.add(
     level="DEBUG"
 )
 
-app = FastAPI(title="Gitrules", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Poll app/actions/*.yaml and hot-swap the catalog when a file changes
+    reload_interval = float(os.getenv("ACTIONS_RELOAD_INTERVAL", "5"))
+    watcher = None
+    if reload_interval > 0:
+        watcher = asyncio.create_task(actions_loader.watch(reload_interval))
+    # One pooled client for the LLM and ingest calls
+    await http_client.start()
+    # Bounded worker pool for recommendations
+    await recommend.recommend_jobs.start()
+    try:
+        yield
+    finally:
+        if watcher:
+            watcher.cancel()
+        await recommend.recommend_jobs.aclose()
+        await http_client.aclose()
+
+app = FastAPI(title="Gitrules", version="0.1.0", lifespan=lifespan)
 
 # Add API Analytics middleware
 api_key = os.getenv("API_ANALYTICS_KEY")
@@ -46,6 +68,8 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 app.include_router(actions.router)
 app.include_router(recommend.router)
 app.include_router(generate.router)
+app.include_router(admin.router)
+app.include_router(search.router)
 
 @app.get("/favicon.ico", operation_id="get_favicon")
 async def favicon():
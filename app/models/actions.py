@@ -67,4 +67,27 @@ class ActionsResponse(BaseModel):
 class ActionsListResponse(BaseModel):
     actions: List[Action]
     total: int
-    has_more: bool
\ No newline at end of file
+    has_more: bool
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to fetch the next page
+
+class Suggestion(BaseModel):
+    text: str  # Display name for actions
+    kind: str  # action, tag or namespace
+    weight: int  # Popularity within the catalog
+    id: Optional[str] = None  # For actions
+    action_type: Optional[ActionType] = None  # For actions
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[Suggestion]
+
+class SimilarAction(BaseModel):
+    id: str
+    display_name: Optional[str] = None
+    action_type: ActionType
+    tags: Optional[List[str]] = None
+    score: float  # Cosine similarity, 0 to 1
+
+class SimilarActionsResponse(BaseModel):
+    id: str
+    similar: List[SimilarAction]
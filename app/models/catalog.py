@@ -0,0 +1,218 @@
+"""
+Compact in-memory representation of catalog entries.
+
+Every action is stored once as a frozen, slotted CatalogEntry. The legacy
+Agent/Rule/MCP/Pack shapes are exposed as views over the entry that copy
+nothing and support both attribute and mapping access, so older callers
+that used the pydantic models or the get_agent()/get_rule() dicts keep
+working. Pydantic models are only built at the API boundary.
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.models.actions import MCP, Action, ActionType, Agent, Pack, Rule
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    """Single canonical record for any action type (treat config as read-only).
+
+    Tags and children are None where the source left them null, so the API
+    models keep telling "none given" apart from an empty list.
+    """
+    id: str
+    name: str
+    action_type: ActionType
+    display_name: Optional[str] = None
+    tags: Optional[Tuple[str, ...]] = ()
+    content: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    author: Optional[str] = None
+    children: Optional[Tuple[str, ...]] = None
+    filename: Optional[str] = None
+    namespace: Optional[str] = None
+    description: Optional[str] = None
+
+    def to_action(self, content: Optional[str] = None) -> Action:
+        """Build the API model, optionally with a body read from a content store"""
+        return Action(
+            id=self.id,
+            name=self.name,
+            display_name=self.display_name,
+            action_type=self.action_type,
+            tags=list(self.tags) if self.tags is not None else None,
+            content=content if content is not None else self.content,
+            config=self.config,
+            author=self.author,
+            children=list(self.children) if self.children is not None else None,
+            filename=self.filename,
+            namespace=self.namespace,
+            # Only MCPs ever carried a description on the Action model
+            description=self.description if self.action_type == ActionType.MCP else None
+        )
+
+
+class EntryView(Mapping):
+    """Read-only legacy view over a CatalogEntry.
+
+    The body is read from the entry or, in mmap storage mode, resolved
+    through `content_of` only when accessed.
+    """
+    __slots__ = ("_entry", "_content_of")
+    _fields: Tuple[str, ...] = ()
+    _model: Any = None
+
+    def __init__(self, entry: CatalogEntry, content_of: Optional[Callable[[str], Optional[str]]] = None):
+        self._entry = entry
+        self._content_of = content_of
+
+    @property
+    def entry(self) -> CatalogEntry:
+        return self._entry
+
+    @property
+    def name(self) -> str:
+        return self._entry.id
+
+    @property
+    def slug(self) -> str:
+        return self._entry.id
+
+    @property
+    def display_name(self) -> Optional[str]:
+        return self._entry.display_name
+
+    @property
+    def tags(self) -> Optional[Tuple[str, ...]]:
+        return self._entry.tags
+
+    @property
+    def content(self) -> Optional[str]:
+        if self._entry.content is None and self._content_of is not None:
+            return self._content_of(self._entry.id)
+        return self._entry.content
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._entry.id!r})"
+
+    def dict(self) -> Dict[str, Any]:
+        """Plain dict in the legacy shape"""
+        return {field: getattr(self, field) for field in self._fields}
+
+    def to_model(self):
+        """Build the legacy pydantic model, for API responses"""
+        data = self.dict()
+        for key, value in data.items():
+            if isinstance(value, tuple):
+                data[key] = list(value)
+        return self._model(**data)
+
+
+class AgentView(EntryView):
+    __slots__ = ()
+    _fields = ("name", "filename", "display_name", "slug", "content", "tags")
+    _model = Agent
+
+    @property
+    def filename(self) -> str:
+        return self._entry.filename
+
+
+class RuleView(EntryView):
+    __slots__ = ()
+    _fields = ("name", "filename", "display_name", "slug", "content", "author",
+               "tags", "children", "type", "namespace")
+    _model = Rule
+
+    @property
+    def filename(self) -> str:
+        return self._entry.filename
+
+    @property
+    def author(self) -> Optional[str]:
+        return self._entry.author
+
+    @property
+    def children(self) -> Optional[Tuple[str, ...]]:
+        return self._entry.children
+
+    @property
+    def type(self) -> str:
+        return self._entry.action_type.value
+
+    @property
+    def namespace(self) -> Optional[str]:
+        return self._entry.namespace
+
+
+class MCPView(EntryView):
+    __slots__ = ()
+    _fields = ("name", "config", "tags", "description")
+    _model = MCP
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self._entry.config or {}
+
+    @property
+    def description(self) -> Optional[str]:
+        return self._entry.description
+
+
+class PackView(EntryView):
+    __slots__ = ()
+    _fields = ("id", "name", "display_name", "tags", "description", "actions")
+    _model = Pack
+
+    @property
+    def id(self) -> str:
+        return self._entry.id
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    @property
+    def description(self) -> Optional[str]:
+        return self._entry.description
+
+    @property
+    def actions(self) -> Tuple[str, ...]:
+        return self._entry.children
+
+
+class EntryViews(Sequence):
+    """Lazily creates legacy views over a tuple of entries"""
+    __slots__ = ("_entries", "_view", "_content_of")
+
+    def __init__(self, entries: Tuple[CatalogEntry, ...], view: type,
+                 content_of: Optional[Callable[[str], Optional[str]]] = None):
+        self._entries = entries
+        self._view = view
+        self._content_of = content_of
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(entry, self._content_of) for entry in self._entries[index]]
+        return self._view(self._entries[index], self._content_of)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        view, content_of = self._view, self._content_of
+        for entry in self._entries:
+            yield view(entry, content_of)
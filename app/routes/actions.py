@@ -1,16 +1,36 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.models.actions import Action, ActionType, ActionsListResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.models.actions import (
+    Action,
+    ActionType,
+    ActionsListResponse,
+    SimilarAction,
+    SimilarActionsResponse,
+    SuggestResponse,
+    Suggestion
+)
 from app.services.actions_loader import actions_loader
+from app.services.response_cache import ResponseCache
+from app.services.similarity import SimilarityIndex
+from app.services.suggest_index import SuggestIndex
 from typing import Optional
 
 router = APIRouter(prefix="/api", tags=["actions"])
 
+# Encoded /api/actions responses, invalidated whenever the catalog version changes
+actions_response_cache = ResponseCache()
+
+# Typeahead index, rebuilt along with the catalog
+actions_loader.register_artifact("suggest_index", SuggestIndex)
+actions_loader.register_artifact("similarity_index", SimilarityIndex)
+
 @router.get("/actions", response_model=ActionsListResponse, operation_id="get_unified_actions")
 async def get_unified_actions(
+    request: Request,
     action_type: Optional[ActionType] = Query(None, description="Filter by action type"),
     tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
     limit: int = Query(30, ge=1, le=100, description="Maximum number of results"),
-    offset: int = Query(0, ge=0, description="Number of items to skip")
+    offset: int = Query(0, ge=0, description="Number of items to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page; takes precedence over offset")
 ):
     """Get all actions in unified format with optional filtering"""
     # Parse tags if provided
@@ -18,30 +38,73 @@ async def get_unified_actions(
     if tags:
         tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
     
-    # Get filtered actions
-    filtered_actions = actions_loader.get_actions(
-        action_type=action_type,
-        tags=tag_list,
-        limit=limit,
-        offset=offset
-    )
+    catalog = actions_loader.catalog
     
-    # Get total count for pagination
-    all_filtered = actions_loader.get_actions(
-        action_type=action_type,
-        tags=tag_list,
-        limit=10000,  # Large number to get all
-        offset=0
-    )
-    total = len(all_filtered)
+    def render() -> bytes:
+        # Get the page and the total count in a single pass
+        page = catalog.query_actions(
+            action_type=action_type,
+            tags=tag_list,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+        return ActionsListResponse(
+            actions=[catalog.to_action(entry) for entry in page.actions],
+            total=page.total,
+            has_more=page.next_cursor is not None,
+            next_cursor=page.next_cursor
+        ).model_dump_json().encode()
     
-    return ActionsListResponse(
-        actions=filtered_actions,
-        total=total,
-        has_more=(offset + limit) < total
-    )
-
+    # Tags are OR-ed, so their order does not change the result
+    key = (action_type, tuple(sorted(set(tag_list or ()))), limit, offset, cursor)
+    try:
+        encoded = actions_response_cache.get_or_encode(catalog.version, key, render)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return actions_response_cache.respond(request, encoded)
 
 
+@router.get("/suggest", response_model=SuggestResponse, operation_id="suggest_actions")
+async def suggest_actions(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions")
+):
+    """Complete a prefix to action names, tags and namespaces, most popular first"""
+    index = actions_loader.catalog.artifact("suggest_index", SuggestIndex)
+    
+    return SuggestResponse(
+        query=q,
+        suggestions=[Suggestion(**suggestion._asdict()) for suggestion in index.suggest(q, limit)]
+    )
 
 
+@router.get("/actions/{action_id}/similar", response_model=SimilarActionsResponse,
+            operation_id="get_similar_actions", tags=["mcp"])
+async def get_similar_actions(
+    action_id: str,
+    action_type: Optional[ActionType] = Query(None, description="Only return actions of this type"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results")
+):
+    """Find the actions most similar to a given agent, rule or MCP, by content and tags"""
+    catalog = actions_loader.catalog
+    position = catalog.position_of(action_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Action not found: {action_id}")
+    
+    index = catalog.artifact("similarity_index", SimilarityIndex)
+    neighbours = index.similar(position, limit, [action_type] if action_type else None)
+    
+    similar = []
+    for neighbour, score in neighbours:
+        entry = catalog.actions[neighbour]
+        similar.append(SimilarAction(
+            id=entry.id,
+            display_name=entry.display_name,
+            action_type=entry.action_type,
+            tags=list(entry.tags or ()),
+            score=round(score, 4)
+        ))
+    
+    return SimilarActionsResponse(id=action_id, similar=similar)
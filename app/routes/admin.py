@@ -0,0 +1,75 @@
+"""
+Admin routes for operating a running instance.
+"""
+
+import asyncio
+import os
+import secrets
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from pydantic import BaseModel
+
+from app.routes.actions import actions_response_cache
+from app.routes.recommend import recommend_jobs, recommendation_cache, recommendation_flights
+from app.services.actions_loader import actions_loader
+from app.services.ingest_cache import ingest_cache
+from app.services.search_service import search_service
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+class ReloadResponse(BaseModel):
+    reloaded: List[str]
+    catalog_version: str
+    total: int
+
+
+def require_admin(token: Optional[str]):
+    """Reject the request unless it carries the configured ADMIN_TOKEN"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/reload", response_model=ReloadResponse, operation_id="reload_actions")
+async def reload_actions(
+    force: bool = Query(False, description="Re-parse every category even if unchanged"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Reload changed action files and swap in the new catalog"""
+    require_admin(x_admin_token)
+    
+    # Parsing is blocking, keep it off the event loop
+    reloaded = await asyncio.to_thread(actions_loader.reload, force)
+    catalog = actions_loader.catalog
+    
+    return ReloadResponse(
+        reloaded=reloaded,
+        catalog_version=catalog.version,
+        total=len(catalog.actions)
+    )
+
+
+@router.get("/cache-stats", operation_id="get_cache_stats")
+async def get_cache_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Size and hit/miss counters of the in-process caches"""
+    require_admin(x_admin_token)
+    
+    return {
+        "catalog_version": actions_loader.catalog.version,
+        "actions_responses": actions_response_cache.stats(),
+        "search_results": search_service.cache.stats(),
+        "ingested_contexts": ingest_cache.stats(),
+        "recommendations": {**recommendation_cache.stats(), "single_flight": recommendation_flights.stats()}
+    }
+
+
+@router.get("/queue-stats", operation_id="get_queue_stats")
+async def get_queue_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Depth, wait and run times of the recommendation job queue"""
+    require_admin(x_admin_token)
+    
+    return {"recommendations": recommend_jobs.stats()}
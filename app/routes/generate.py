@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
+from app.models.actions import ActionType
 from app.services.actions_loader import actions_loader
 
 router = APIRouter(prefix="/api", tags=["generate"])
@@ -22,32 +23,22 @@ async def generate_configuration(request: GenerateRequest) -> GenerateResponse:
     """Generate configuration files from selected action IDs"""
     
     files = {}
+    # Use one catalog snapshot for the whole request, even across a reload
+    catalog = actions_loader.catalog
     
     # Load action details
     selected_agents = []
     selected_rules = []
     selected_mcps = []
     
-    for action_id in request.action_ids:
-        # Try to find the action in different categories
-        
-        # Check agents
-        agent = actions_loader.get_agent(action_id)
-        if agent:
-            selected_agents.append(agent)
-            continue
-            
-        # Check rules
-        rule = actions_loader.get_rule(action_id)
-        if rule:
-            selected_rules.append(rule)
-            continue
-            
-        # Check MCPs
-        mcp = actions_loader.get_mcp(action_id)
-        if mcp:
-            selected_mcps.append(mcp)
-            continue
+    # Rulesets and packs expand to their (transitive) children, deduplicated
+    for entry in catalog.expand_selection(request.action_ids):
+        if entry.action_type == ActionType.AGENT:
+            selected_agents.append(catalog.get_agent(entry.id))
+        elif entry.action_type in (ActionType.RULE, ActionType.RULESET):
+            selected_rules.append(catalog.get_rule(entry.id))
+        elif entry.action_type == ActionType.MCP:
+            selected_mcps.append(catalog.get_mcp(entry.id))
     
     # Generate files based on selected formats
     for format_type in request.formats:
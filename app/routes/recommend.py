@@ -2,21 +2,75 @@
 Route for tool recommendations based on repository analysis.
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, List
-from app.services.smart_ingest import use_gitingest
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Dict, List, Tuple
+import asyncio
+import hashlib
+import json
+import os
+from app.services.actions_loader import actions_loader
+from app.services.cache import PersistentCache
+from app.services.catalog import Catalog
+from app.services.http_client import ClientDisconnected, cancel_on_disconnect
+from app.services.ingest_cache import UnsupportedRepository, normalize_repo_url
+from app.services.job_queue import JobQueue, JobStore, QueueFull
+from app.services.single_flight import SingleFlight, shared_lease
+from app.services.smart_ingest import Schedule, use_gitingest
 from app.services.recommend_tools import (
-    build_tools_catalog,
-    get_catalog_version,
+    JsonObjectScanner,
+    RecommendPrompt,
+    build_recommend_prompt,
+    build_user_message,
     format_catalog_for_prompt,
     call_llm_for_reco,
-    parse_and_validate
+    parse_and_validate,
+    recommendation_key,
+    shortlist_catalog,
+    stream_llm_for_reco
 )
 from loguru import logger
 
 router = APIRouter(prefix="/api", tags=["recommend"])
 
+# Validated recommendations by recommendation_key, kept across restarts
+recommendation_cache = PersistentCache(
+    os.getenv("RECOMMEND_CACHE_PATH", ".cache/recommend.sqlite3"),
+    max_bytes=int(os.getenv("RECOMMEND_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    memory_items=int(os.getenv("RECOMMEND_CACHE_MEMORY_ITEMS", "1024"))
+)
+
+# Concurrent identical requests share one LLM call
+recommendation_flights = SingleFlight("recommend", shared_lease())
+
+# Seconds between keepalive comments on an idle event stream
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# Ingests and LLM calls run on this bounded worker pool; requests someone is
+# waiting on go first, background jobs after. Cache hits and callers joining
+# an identical in-flight request never take a slot.
+recommend_jobs = JobQueue(
+    "recommend",
+    workers=int(os.getenv("RECOMMEND_WORKERS", "4")),
+    max_depth=int(os.getenv("RECOMMEND_QUEUE_MAX", "64")),
+    store=JobStore(
+        Path(os.getenv("RECOMMEND_JOBS_PATH", ".cache/jobs.sqlite3")),
+        ttl=float(os.getenv("RECOMMEND_JOB_TTL", "3600"))
+    )
+)
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 9
+
+# Batch requests: most repositories per request, and how many of one batch
+# may be in the job queue at once
+RECOMMEND_BATCH_MAX = int(os.getenv("RECOMMEND_BATCH_MAX", "500"))
+RECOMMEND_BATCH_CONCURRENCY = int(os.getenv("RECOMMEND_BATCH_CONCURRENCY", "4"))
+
+# Longest pause before a batch item retries a full queue
+BATCH_RETRY_MAX_DELAY = 5.0
+
 
 class RecommendRequest(BaseModel):
     repo_url: Optional[str] = None
@@ -37,16 +91,102 @@ class RecommendResponse(BaseModel):
     context_size: int
     catalog_version: str
     raw: Optional[str] = None  # For debugging
+    cached: bool = False  # Served from the recommendation cache
+
+
+class BatchItem(BaseModel):
+    repo_url: Optional[str] = None
+    context: Optional[str] = None
+
+
+class RecommendBatchRequest(BaseModel):
+    items: List[BatchItem]
+    user_prompt: Optional[str] = "Pick minimal useful tools for this repo"
+
+
+class RecommendJobRequest(RecommendRequest):
+    priority: int = Field(5, ge=1, le=9, description="Lower runs first")
+
+
+class RecommendJobResponse(BaseModel):
+    job_id: str
+    status: str
+    priority: int
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[RecommendResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None  # HTTP status the error would have had
+    queue_depth: Optional[int] = None
 
 
 @router.post("/recommend", response_model=RecommendResponse)
-async def recommend_tools(request: RecommendRequest):
+async def recommend_tools(request: RecommendRequest, http_request: Request):
     """
     Analyze a repository and recommend minimal useful tools.
     
     Accepts either repo_url (for ingestion) or context (pre-ingested).
     Returns a minimal selection of rules, agents, and MCPs.
     """
+    try:
+        # Upstream calls are abandoned if the client goes away
+        return await cancel_on_disconnect(http_request, _recommend(request))
+    except ClientDisconnected:
+        # Nobody is listening, nginx's "client closed request"
+        raise HTTPException(status_code=499, detail="Client closed request")
+
+
+def _too_busy(error: QueueFull) -> HTTPException:
+    """429 for a full queue, shedding the load"""
+    logger.warning(f"Recommendation queue full ({error.depth} waiting), rejecting request")
+    return HTTPException(
+        status_code=429,
+        detail="Too many recommendations in progress, try again shortly",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+async def _queued(awaitable: Awaitable[Any]) -> Any:
+    """Await a job queue call, shedding load with 429 when the queue is full"""
+    try:
+        return await awaitable
+    except QueueFull as e:
+        raise _too_busy(e)
+
+
+def _on_queue(priority: int, wait_when_full: bool = False) -> Schedule:
+    """Runs a unit of expensive work (an ingest or LLM call) on the job queue"""
+    async def schedule(fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            try:
+                return await recommend_jobs.run(fn, priority)
+            except QueueFull as e:
+                if not wait_when_full:
+                    raise _too_busy(e)
+                # Back off instead of failing; interactive requests keep the queue busy
+                await asyncio.sleep(min(e.retry_after, BATCH_RETRY_MAX_DELAY))
+    return schedule
+
+
+async def _ingest(repo_url: str, schedule: Schedule) -> str:
+    """Repository context, 400 for a repository the ingesters do not support"""
+    try:
+        return await use_gitingest(repo_url, schedule=schedule)
+    except UnsupportedRepository as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _recommend(request: RecommendRequest, actions_catalog: Optional[Catalog] = None,
+                     schedule: Optional[Schedule] = None) -> RecommendResponse:
+    """
+    Ingest (if needed), ask the LLM and validate its picks against a catalog snapshot.
+    
+    Only a cache miss, and only the one caller performing it, hands the
+    ingest or LLM call to schedule (default: the job queue at interactive
+    priority).
+    """
+    schedule = schedule or _on_queue(INTERACTIVE_PRIORITY)
     try:
         # Validate input - need at least one
         if not request.repo_url and not request.context:
@@ -62,37 +202,348 @@ async def recommend_tools(request: RecommendRequest):
         else:
             # Ingest the repository
             logger.info(f"Ingesting repository {request.repo_url}")
-            context = await use_gitingest(request.repo_url)
+            context = await _ingest(request.repo_url, schedule)
         context_size = len(context)
         logger.info(f"Context size: {context_size}")
         
-        # Step 2: Build catalog
-        catalog = build_tools_catalog()
-        catalog_version = get_catalog_version(catalog)
-        
-        # Step 3: Format catalog for LLM
-        catalog_text = format_catalog_for_prompt(catalog)
-        
-        # Step 4: Call LLM
-        llm_raw = call_llm_for_reco(
-            context=context,
-            catalog_text=catalog_text,
-            user_prompt=request.user_prompt or ""
-        )
-        
-        # Step 5: Parse and validate
-        preselect, rationales = parse_and_validate(llm_raw, catalog)
+        # Same context, prompt, catalog and model: reuse the validated answer
+        actions_catalog = actions_catalog or actions_loader.catalog
+        cache_key = recommendation_key(context, request.user_prompt or "", actions_catalog.version)
+        cached = await _cached_recommendation(cache_key)
+        if cached is not None:
+            return cached
         
-        return RecommendResponse(
-            success=True,
-            preselect=PreselectionData(**preselect),
-            rationales=rationales,
-            context_size=context_size,
-            catalog_version=catalog_version,
-            raw=llm_raw  # Include for debugging
+        return await recommendation_flights.do(
+            cache_key,
+            lambda: _recommend_uncached(cache_key, context, request.user_prompt or "", actions_catalog, schedule)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _cached_recommendation(cache_key: str) -> Optional[RecommendResponse]:
+    cached = await recommendation_cache.get_entry(cache_key)
+    if cached is None:
+        return None
+    logger.info(f"Recommendation cache hit {cache_key[:12]}")
+    response = RecommendResponse.model_validate_json(cached[1])
+    response.cached = True
+    return response
+
+
+def _prepare_prompt(context: str, user_prompt: str, actions_catalog: Optional[Catalog] = None
+                    ) -> Tuple[RecommendPrompt, Dict[str, List[Dict]], str]:
+    """Prompt of a catalog snapshot (default: current), the candidates the LLM is shown and the user message"""
+    # Catalog and system prompt, precomputed per catalog snapshot
+    actions_catalog = actions_catalog or actions_loader.catalog
+    prompt = actions_catalog.artifact("recommend_prompt", build_recommend_prompt)
+    
+    # Large catalogs are shortlisted against the repository instead
+    candidates = prompt.tools
+    catalog_text = None
+    if prompt.shortlisted:
+        candidates = shortlist_catalog(prompt.tools, context, actions_catalog=actions_catalog)
+        catalog_text = format_catalog_for_prompt(candidates)
+    return prompt, candidates, build_user_message(context, user_prompt, catalog_text)
+
+
+async def _validated(cache_key: str, llm_raw: str, candidates: Dict[str, List[Dict]],
+                     prompt: RecommendPrompt, context: str) -> RecommendResponse:
+    """Validate the LLM's picks (against what it was shown) and cache them"""
+    preselect, rationales = parse_and_validate(llm_raw, candidates)
+    
+    response = RecommendResponse(
+        success=True,
+        preselect=PreselectionData(**preselect),
+        rationales=rationales,
+        context_size=len(context),
+        catalog_version=prompt.catalog_version,
+        raw=llm_raw  # Include for debugging
+    )
+    await recommendation_cache.set(cache_key, response.model_dump_json())
+    return response
+
+
+async def _recommend_uncached(cache_key: str, context: str, user_prompt: str,
+                              actions_catalog: Optional[Catalog], schedule: Schedule) -> RecommendResponse:
+    """Ask the LLM and cache the validated picks (shared by concurrent callers)"""
+    # Another worker holding the lease may have just answered
+    cached = await _cached_recommendation(cache_key)
+    if cached is not None:
+        return cached
+    
+    prompt, candidates, user_message = _prepare_prompt(context, user_prompt, actions_catalog)
+    llm_raw = await schedule(
+        lambda: call_llm_for_reco(system_prompt=prompt.system_prompt, user_message=user_message)
+    )
+    return await _validated(cache_key, llm_raw, candidates, prompt, context)
+
+
+@router.post("/recommend/stream", operation_id="recommend_tools_stream")
+async def recommend_tools_stream(request: RecommendRequest):
+    """
+    Same as /api/recommend, reported as server-sent events while it works.
+    
+    Events: "stage" (queue, ingest and llm started/finished, with the queue
+    depth and context_size),
+    "catalog" (catalog_version), "token" (LLM output as it streams),
+    "preselection" (the RecommendResponse, sent as soon as the LLM's JSON
+    object is complete), "error" and finally "done". Comment lines keep
+    proxies from timing out during long stages. Identical concurrent
+    requests share one LLM call, and only the request making it gets the
+    queue, llm started and token events.
+    """
+    if not request.repo_url and not request.context:
+        raise HTTPException(
+            status_code=400,
+            detail="Either repo_url or context must be provided"
+        )
+    return StreamingResponse(
+        _sse(_recommend_events(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _recommend_events(request: RecommendRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """(event, data) pairs of one streamed recommendation"""
+    user_prompt = request.user_prompt or ""
+    # One catalog snapshot for the cache key, the prompt and the validation
+    actions_catalog = actions_loader.catalog
+    if request.context:
+        context = request.context
+    else:
+        yield "stage", {"stage": "ingest", "status": "started", "repo_url": request.repo_url}
+        context = await _ingest(request.repo_url, _on_queue(INTERACTIVE_PRIORITY))
+    yield "stage", {"stage": "ingest", "status": "finished", "context_size": len(context)}
+    
+    cache_key = recommendation_key(context, user_prompt, actions_catalog.version)
+    cached = await _cached_recommendation(cache_key)
+    if cached is not None:
+        yield "catalog", {"catalog_version": cached.catalog_version}
+        yield "preselection", cached.model_dump()
+        return
+    
+    prompt = actions_catalog.artifact("recommend_prompt", build_recommend_prompt)
+    yield "catalog", {"catalog_version": prompt.catalog_version}
+    
+    # Progress of the LLM call, if this request is the one making it
+    progress: asyncio.Queue = asyncio.Queue()
+    
+    async def relay(system_prompt: str, user_message: str) -> str:
+        await progress.put(("stage", {"stage": "queue", "status": "finished"}))
+        await progress.put(("stage", {"stage": "llm", "status": "started"}))
+        scanner = JsonObjectScanner()
+        tokens = stream_llm_for_reco(system_prompt, user_message)
+        try:
+            async for delta in tokens:
+                await progress.put(("token", {"text": delta}))
+                llm_raw = scanner.feed(delta)
+                if llm_raw is not None:
+                    # The answer is complete, the rest of the stream is not needed
+                    return llm_raw
+        finally:
+            await tokens.aclose()
+        return scanner.text
+    
+    async def uncached() -> RecommendResponse:
+        # Same steps as _recommend_uncached, with the LLM's tokens relayed as they arrive
+        cached = await _cached_recommendation(cache_key)
+        if cached is not None:
+            return cached
+        prompt, candidates, user_message = _prepare_prompt(context, user_prompt, actions_catalog)
+        depth = recommend_jobs.stats()["depth"]
+        await progress.put(("stage", {"stage": "queue", "status": "started", "depth": depth}))
+        llm_raw = await _on_queue(INTERACTIVE_PRIORITY)(lambda: relay(prompt.system_prompt, user_message))
+        return await _validated(cache_key, llm_raw, candidates, prompt, context)
+    
+    # Shared with identical /recommend and stream requests; a request that
+    # joins another's call only gets the result
+    flight = asyncio.ensure_future(recommendation_flights.do(cache_key, uncached))
+    flight.add_done_callback(lambda _: progress.put_nowait(None))
+    try:
+        while (event := await progress.get()) is not None:
+            yield event
+        response = await flight
+    finally:
+        # Client gone or stream failed: stop waiting, and drop the call if no one else is
+        flight.cancel()
+    yield "stage", {"stage": "llm", "status": "finished"}
+    yield "preselection", response.model_dump()
+
+
+async def _sse(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Encode events as SSE, with keepalive comments while a stage is quiet"""
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            logger.error(f"Streamed recommendation failed: {e}")
+            await queue.put(("error", {
+                "detail": getattr(e, "detail", None) or str(e),
+                "status_code": getattr(e, "status_code", 500)
+            }))
+        finally:
+            await queue.put(None)
+    
+    # Cancelled with the response when the client disconnects
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                break
+            event, data = item
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    finally:
+        producer.cancel()
+
+
+@router.post("/recommend/batch", operation_id="recommend_tools_batch")
+async def recommend_tools_batch(request: RecommendBatchRequest):
+    """
+    Recommend tools for many repositories, streamed back as NDJSON.
+    
+    Each item is a repo_url or a context. Items run a few at a time at
+    background priority, all against one catalog snapshot; items naming
+    the same repository or carrying the same context are run once. One
+    line is written per item as soon as it finishes: {"type": "result",
+    "index", "repo_url", "result"} or {"type": "error", "index",
+    "repo_url", "error", "status_code"}, then a final {"type": "summary"}.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item must be provided")
+    if len(request.items) > RECOMMEND_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {RECOMMEND_BATCH_MAX} items per batch"
+        )
+    for index, item in enumerate(request.items):
+        if not item.repo_url and not item.context:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Item {index}: either repo_url or context must be provided"
+            )
+    return StreamingResponse(
+        _batch_lines(request),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _batch_key(item: BatchItem) -> str:
+    """Items with the same key get the same recommendation"""
+    if item.context:
+        return "context:" + hashlib.sha256(item.context.encode()).hexdigest()
+    canonical, ref = normalize_repo_url(item.repo_url)
+    return f"repo:{canonical}@{ref}"
+
+
+async def _batch_lines(request: RecommendBatchRequest) -> AsyncIterator[str]:
+    """NDJSON lines of a batch, in the order its items finish"""
+    # One catalog snapshot, and so one prompt, for the whole batch
+    actions_catalog = actions_loader.catalog
+    # Reported as the results report it
+    catalog_version = actions_catalog.artifact("recommend_prompt", build_recommend_prompt).catalog_version
+    semaphore = asyncio.Semaphore(RECOMMEND_BATCH_CONCURRENCY)
+    
+    groups: Dict[str, List[int]] = {}
+    for index, item in enumerate(request.items):
+        groups.setdefault(_batch_key(item), []).append(index)
+    
+    # Lowest priority, waiting (not failing) while the queue is full
+    schedule = _on_queue(BATCH_PRIORITY, wait_when_full=True)
+    
+    async def run(item: BatchItem) -> RecommendResponse:
+        single = RecommendRequest(repo_url=item.repo_url, context=item.context, user_prompt=request.user_prompt)
+        async with semaphore:
+            return await _recommend(single, actions_catalog, schedule)
+    
+    tasks = {asyncio.create_task(run(request.items[indices[0]])): indices for indices in groups.values()}
+    succeeded = failed = 0
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                for index in tasks[task]:
+                    line: Dict[str, Any] = {"index": index, "repo_url": request.items[index].repo_url}
+                    if error is None:
+                        line.update(type="result", result=task.result().model_dump())
+                        succeeded += 1
+                    else:
+                        line.update(
+                            type="error",
+                            error=str(getattr(error, "detail", None) or error),
+                            status_code=getattr(error, "status_code", 500)
+                        )
+                        failed += 1
+                    yield json.dumps(line) + "\n"
+        
+        yield json.dumps({
+            "type": "summary",
+            "total": len(request.items),
+            "unique": len(groups),
+            "succeeded": succeeded,
+            "failed": failed,
+            "catalog_version": catalog_version
+        }) + "\n"
+    finally:
+        # The client went away: drop the items still queued or running
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/recommend/jobs", response_model=RecommendJobResponse, status_code=202,
+             operation_id="create_recommend_job")
+async def create_recommend_job(request: RecommendJobRequest):
+    """
+    Queue a recommendation and return its job id at once.
+    
+    Poll GET /api/recommend/jobs/{job_id} for the result. Responds 429 with
+    a Retry-After header when too many jobs are already waiting.
+    """
+    if not request.repo_url and not request.context:
+        raise HTTPException(
+            status_code=400,
+            detail="Either repo_url or context must be provided"
+        )
+    # The context itself can be large and is not needed to report on the job
+    record = request.model_dump(exclude={"context"})
+    record["context_size"] = len(request.context or "")
+    # Cache hits finish at once; only a missing ingest or LLM call waits for a worker
+    job = await _queued(recommend_jobs.spawn(
+        lambda: _recommend(request, schedule=_on_queue(request.priority, wait_when_full=True)),
+        request.priority,
+        persist=record
+    ))
+    return RecommendJobResponse(
+        job_id=job.id,
+        status="queued",
+        priority=job.priority,
+        queue_depth=recommend_jobs.stats()["depth"]
+    )
+
+
+@router.get("/recommend/jobs/{job_id}", response_model=RecommendJobResponse, operation_id="get_recommend_job")
+async def get_recommend_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish")
+):
+    """Status of a recommendation job, and its result once it succeeded"""
+    record = await recommend_jobs.wait(job_id, wait)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return RecommendJobResponse(**record)
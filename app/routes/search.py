@@ -0,0 +1,54 @@
+"""
+Search over the action catalog, also exposed as a tool on the MCP server.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from app.services.actions_loader import actions_loader
+from app.services.search_service import MAX_RESULTS, RESULT_KEYS, search_service
+
+router = APIRouter(prefix="/api", tags=["search", "mcp"])
+
+
+class SearchHit(BaseModel):
+    type: str  # agent, rule or mcp
+    id: str
+    relevance: float
+    item: Dict[str, Any]  # Legacy agent/rule/mcp shape, without content or config
+
+
+class SearchResponse(BaseModel):
+    query: str
+    hits: List[SearchHit]
+    total: int  # Ranked hits available, capped at MAX_RESULTS
+    has_more: bool
+    catalog_version: str
+
+
+@router.get("/search", response_model=SearchResponse, operation_id="search_actions")
+async def search_actions(
+    q: str = Query(..., min_length=1, max_length=200, description="Search query; supports * and ? wildcards"),
+    types: Optional[str] = Query(None, description="Comma-separated types to search: agents, rules, mcps"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, lt=MAX_RESULTS, description="Number of results to skip")
+):
+    """Search agents, rules and MCPs by name, tags, author and content"""
+    groups = None
+    if types:
+        groups = [t.strip().lower() for t in types.split(',') if t.strip()]
+        unknown = [t for t in groups if t not in RESULT_KEYS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(unknown)}")
+    
+    # Served from the cache when the same query was ranked for this catalog version
+    hits = search_service.search(q, groups)
+    page = hits[offset:offset + limit]
+    
+    return SearchResponse(
+        query=q,
+        hits=[SearchHit(**hit) for hit in page],
+        total=len(hits),
+        has_more=offset + limit < len(hits),
+        catalog_version=actions_loader.catalog.version
+    )
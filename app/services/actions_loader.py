@@ -1,271 +1,332 @@
-import yaml
-from typing import List, Dict, Any, Optional
+import asyncio
+import os
+import threading
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
 from pathlib import Path
-from app.models.actions import Agent, Rule, MCP, Pack, Action, ActionType
+from dataclasses import replace
+from app.models.actions import ActionType
+from app.models.catalog import AgentView, CatalogEntry, MCPView, PackView, RuleView
+from app.services.catalog import ActionsPage, Catalog, CategoryData
+from app.services.content_store import CONTENT_STORAGE_MODES, ContentStore
+from app.services.catalog_snapshot import (
+    CATEGORY_FILES,
+    file_digest,
+    load_yaml,
+    read_snapshot,
+    source_digests,
+    write_snapshot
+)
 from loguru import logger
 
+
+def _tuple(values: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+    """Tuple of a YAML list, keeping null as None"""
+    return tuple(values) if values is not None else None
+
+
 class ActionsLoader:
-    def __init__(self):
-        self.actions_dir = Path(__file__).parent.parent / "actions"
-        self.actions: List[Action] = []
-        # Keep legacy lists for backward compatibility
-        self.agents: List[Agent] = []
-        self.rules: List[Rule] = []
-        self.mcps: List[MCP] = []
-        self.packs: List[Pack] = []
+    def __init__(self, actions_dir: Optional[Path] = None, use_snapshot: bool = True,
+                 content_storage: Optional[str] = None):
+        self.actions_dir = actions_dir or Path(__file__).parent.parent / "actions"
+        self.use_snapshot = use_snapshot
+        # "memory" keeps bodies on the models, "mmap" moves them to a ContentStore
+        self.content_storage = content_storage or os.getenv("ACTIONS_CONTENT_STORAGE", "memory")
+        if self.content_storage not in CONTENT_STORAGE_MODES:
+            raise ValueError(f"Unknown content storage mode: {self.content_storage}")
+        # (mtime_ns, size) of each source file, used to detect changes cheaply
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._reload_lock = threading.Lock()
+        # Catalog artifacts that are built eagerly, before a catalog goes live
+        self._artifact_factories: Dict[str, Callable[[Catalog], Any]] = {}
         logger.info(f"Loading actions from {self.actions_dir}")
-        self.load_all()
-    
-    def load_all(self):
-        """Load all actions from consolidated YAML files"""
-        self.load_agents()
-        self.load_rules()
-        self.load_mcps()
-        self.load_packs()
-    
-    def load_agents(self):
-        """Load all agents from agents.yaml"""
-        agents_file = self.actions_dir / "agents.yaml"
-        if agents_file.exists():
+        self.catalog: Catalog = self.load_all()
+
+    def load_all(self) -> Catalog:
+        """Load all actions, preferring the compiled snapshot over YAML"""
+        digests = source_digests(self.actions_dir)
+        snapshot = read_snapshot(self.actions_dir) if self.use_snapshot else None
+
+        categories = {}
+        for category in CATEGORY_FILES:
+            self._stamps[category] = self._stamp(category)
+            document = None
+            if snapshot:
+                try:
+                    document = snapshot.document(category, digests[category])
+                except KeyError:
+                    logger.info(f"Snapshot is stale for {CATEGORY_FILES[category]}, parsing YAML")
+            categories[category] = self._load_category(category, digests[category], document)
+
+        # Reuse the precomputed indexes only if no source changed since compilation
+        precomputed = None
+        if snapshot and snapshot.is_fresh(digests):
+            precomputed = snapshot.indexes
+            logger.info("Catalog loaded from compiled snapshot")
+        catalog = Catalog(categories, precomputed)
+        logger.info(f"Indexed {len(catalog.actions)} actions (catalog version {catalog.version})")
+        return catalog
+
+    def _stamp(self, category: str) -> Optional[Tuple[int, int]]:
+        """Cheap change marker for a category file, or None if it is missing"""
+        try:
+            stat = (self.actions_dir / CATEGORY_FILES[category]).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_category(self, category: str, digest: Optional[str], document: Any = None,
+                       previous: Optional[CategoryData] = None) -> CategoryData:
+        """Parse one category file into catalog entries.
+
+        If parsing fails the previous data for the category is kept, so a
+        broken edit never empties a running catalog.
+        """
+        path = self.actions_dir / CATEGORY_FILES[category]
+        if digest is None:
+            if category == "agents":
+                logger.warning(f"Agents file not found: {path}")
+            return CategoryData(digest=None, entries=())
+
+        try:
+            if document is None:
+                document = load_yaml(path)
+            parse = getattr(self, f"load_{category}")
+            entries = parse(document)
+        except Exception as e:
+            logger.error(f"Error loading {category} from {path}: {e}")
+            if previous is not None:
+                return previous
+            return CategoryData(digest=digest, entries=())
+
+        contents = None
+        if self.content_storage == "mmap":
+            contents, entries = self._move_contents(entries)
+        return CategoryData(digest=digest, entries=tuple(entries), contents=contents)
+
+    def _move_contents(self, entries: List[CatalogEntry]) -> Tuple[ContentStore, List[CatalogEntry]]:
+        """Move bodies into a memory-mapped store, returning metadata-only entries"""
+        store = ContentStore()
+        stripped = []
+        for entry in entries:
+            if entry.content is not None:
+                store.add(entry.id, entry.content)
+                entry = replace(entry, content=None)
+            stripped.append(entry)
+        store.freeze()
+        return store, stripped
+
+    def reload(self, force: bool = False) -> List[str]:
+        """Re-parse changed category files and atomically swap in a new catalog.
+
+        Blocking; call it from a worker thread when on the event loop. Only the
+        categories whose files changed are parsed again, the others are reused
+        from the current catalog. Requests holding the old catalog keep a
+        consistent view until they finish.
+
+        Args:
+            force: Re-parse every category even if its file looks unchanged
+
+        Returns:
+            Names of the categories that were reloaded
+        """
+        with self._reload_lock:
+            current = self.catalog
+            categories = dict(current.categories)
+            reloaded = []
+            for category in CATEGORY_FILES:
+                stamp = self._stamp(category)
+                if not force and stamp == self._stamps.get(category):
+                    continue
+                self._stamps[category] = stamp
+
+                # mtime can change without the content changing (touch, checkout)
+                digest = file_digest(self.actions_dir / CATEGORY_FILES[category])
+                if not force and digest == current.categories[category].digest:
+                    continue
+
+                categories[category] = self._load_category(
+                    category, digest, previous=current.categories[category]
+                )
+                reloaded.append(category)
+
+            if reloaded:
+                catalog = Catalog(categories)
+                self._build_artifacts(catalog)
+                self.catalog = catalog
+                logger.info(f"Reloaded {', '.join(reloaded)}: {len(catalog.actions)} actions "
+                            f"(catalog version {current.version} -> {catalog.version})")
+            return reloaded
+
+    def register_artifact(self, name: str, factory: Callable[[Catalog], Any]):
+        """Build `factory(catalog)` for the current catalog and every reload.
+
+        Reloads build registered artifacts before swapping the new catalog
+        in, so requests never pay for them.
+        """
+        self._artifact_factories[name] = factory
+        self.catalog.artifact(name, factory)
+
+    def _build_artifacts(self, catalog: Catalog):
+        for name, factory in self._artifact_factories.items():
             try:
-                with open(agents_file, 'r') as f:
-                    data = yaml.safe_load(f)
-                    if data and 'agents' in data:
-                        logger.info(f"Loading {len(data['agents'])} agents")
-                        for agent_data in data['agents']:
-                            slug = agent_data.get('slug', '')
-                            # Create Action object
-                            action = Action(
-                                id=slug,
-                                name=slug,
-                                display_name=agent_data.get('display_name'),
-                                action_type=ActionType.AGENT,
-                                tags=agent_data.get('tags', []),
-                                content=agent_data.get('content'),
-                                filename=f"{slug}.md"
-                            )
-                            self.actions.append(action)
-                            
-                            # Also create legacy Agent for backward compatibility
-                            self.agents.append(Agent(
-                                name=slug,
-                                filename=f"{slug}.md",
-                                display_name=agent_data.get('display_name'),
-                                slug=slug,
-                                content=agent_data.get('content'),
-                                tags=agent_data.get('tags', [])
-                            ))
+                catalog.artifact(name, factory)
             except Exception as e:
-                logger.error(f"Error loading agents from {agents_file}: {e}")
-                self.agents = []
-        else:
-            logger.warning(f"Agents file not found: {agents_file}")
-            self.agents = []
-    
-    def _parse_rule(self, slug: str, rule_data: Dict[str, Any]) -> Rule:
-        """Parse a single rule or ruleset from the YAML data"""
-        rule = Rule(
-            name=slug,  # Use slug as name for backward compat
-            filename=f"{slug}.yaml",  # Virtual filename
-            display_name=rule_data.get('display_name'),
-            slug=slug,
-            content=rule_data.get('content'),
-            author=rule_data.get('author'),
-            tags=rule_data.get('tags'),
-            type=rule_data.get('type', 'rule'),
-            namespace=rule_data.get('namespace'),
-            children=rule_data.get('children')  # Now just a list of rule IDs
+                # Left to be built on first use instead
+                logger.error(f"Error building {name} for catalog {catalog.version}: {e}")
+
+    async def watch(self, interval: float):
+        """Poll the action files for changes and reload them off the event loop"""
+        logger.info(f"Watching {self.actions_dir} for changes every {interval}s")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"Error reloading actions: {e}")
+
+    def compile_snapshot(self) -> Path:
+        """Compile the YAML sources into a snapshot with precomputed indexes"""
+        documents = {}
+        for category, filename in CATEGORY_FILES.items():
+            path = self.actions_dir / filename
+            if path.exists():
+                documents[category] = load_yaml(path)
+        return write_snapshot(
+            self.actions_dir, documents, self.catalog.export_indexes(), source_digests(self.actions_dir)
         )
-        
-        return rule
-    
-    def load_rules(self):
-        """Load all rules from rules.yaml"""
-        rules_file = self.actions_dir / "rules.yaml"
-        if rules_file.exists():
-            with open(rules_file, 'r') as f:
-                data = yaml.safe_load(f)
-                if data:
-                    self.rules = []
-                    # Now the top-level keys are the slugs
-                    for slug, rule_data in data.items():
-                        rule = self._parse_rule(slug, rule_data)
-                        self.rules.append(rule)
-                        
-                        # Create Action object
-                        rule_type = ActionType.RULESET if rule_data.get('type') == 'ruleset' else ActionType.RULE
-                        action = Action(
-                            id=slug,
-                            name=slug,
-                            display_name=rule_data.get('display_name'),
-                            action_type=rule_type,
-                            tags=rule_data.get('tags'),
-                            content=rule_data.get('content'),
-                            author=rule_data.get('author'),
-                            children=rule_data.get('children'),
-                            filename=f"{slug}.yaml",
-                            namespace=rule_data.get('namespace')
-                        )
-                        self.actions.append(action)
-        else:
-            self.rules = []
-    
-    def load_mcps(self):
-        """Load all MCPs from mcps.yaml"""
-        mcps_file = self.actions_dir / "mcps.yaml"
-        if mcps_file.exists():
-            with open(mcps_file, 'r') as f:
-                data = yaml.safe_load(f)
-                if data and 'mcps' in data:
-                    for mcp_data in data['mcps']:
-                        name = mcp_data.get('slug', '')
-                        # Create Action object
-                        action = Action(
-                            id=name,
-                            name=name,
-                            display_name=mcp_data.get('display_name'),
-                            action_type=ActionType.MCP,
-                            tags=mcp_data.get('tags', []),
-                            config=mcp_data.get('config', {}),
-                            description=mcp_data.get('description')
-                        )
-                        self.actions.append(action)
-                        
-                        # Also create legacy MCP for backward compatibility
-                        self.mcps.append(MCP(
-                            name=name,
-                            config=mcp_data.get('config', {}),
-                            tags=mcp_data.get('tags', []),
-                            description=mcp_data.get('description')
-                        ))
-        else:
-            self.mcps = []
-    
+
+    def load_agents(self, data: Any) -> List[CatalogEntry]:
+        """Build agent entries from the agents.yaml document"""
+        entries = []
+        if data and 'agents' in data:
+            logger.info(f"Loading {len(data['agents'])} agents")
+            for agent_data in data['agents']:
+                slug = agent_data.get('slug', '')
+                entries.append(CatalogEntry(
+                    id=slug,
+                    name=slug,
+                    display_name=agent_data.get('display_name'),
+                    action_type=ActionType.AGENT,
+                    tags=_tuple(agent_data.get('tags', [])),
+                    content=agent_data.get('content'),
+                    filename=f"{slug}.md"
+                ))
+        return entries
+
+    def load_rules(self, data: Any) -> List[CatalogEntry]:
+        """Build rule and ruleset entries from the rules.yaml document"""
+        entries = []
+        if data:
+            # Now the top-level keys are the slugs
+            for slug, rule_data in data.items():
+                rule_type = ActionType.RULESET if rule_data.get('type') == 'ruleset' else ActionType.RULE
+                entries.append(CatalogEntry(
+                    id=slug,
+                    name=slug,
+                    display_name=rule_data.get('display_name'),
+                    action_type=rule_type,
+                    tags=_tuple(rule_data.get('tags')),
+                    content=rule_data.get('content'),
+                    author=rule_data.get('author'),
+                    children=_tuple(rule_data.get('children')),  # List of rule IDs
+                    filename=f"{slug}.yaml",  # Virtual filename
+                    namespace=rule_data.get('namespace')
+                ))
+        return entries
+
+    def load_mcps(self, data: Any) -> List[CatalogEntry]:
+        """Build MCP entries from the mcps.yaml document"""
+        entries = []
+        if data and 'mcps' in data:
+            for mcp_data in data['mcps']:
+                name = mcp_data.get('slug', '')
+                entries.append(CatalogEntry(
+                    id=name,
+                    name=name,
+                    display_name=mcp_data.get('display_name'),
+                    action_type=ActionType.MCP,
+                    tags=_tuple(mcp_data.get('tags', [])),
+                    config=mcp_data.get('config', {}),
+                    description=mcp_data.get('description')
+                ))
+        return entries
+
+    def load_packs(self, data: Any) -> List[CatalogEntry]:
+        """Build pack entries from the packs.yaml document"""
+        entries = []
+        if data and 'packs' in data:
+            for pack_data in data['packs']:
+                entries.append(CatalogEntry(
+                    id=pack_data.get('id', ''),
+                    name=pack_data.get('name', ''),
+                    display_name=pack_data.get('display_name'),
+                    action_type=ActionType.PACK,
+                    tags=_tuple(pack_data.get('tags', [])),
+                    description=pack_data.get('description'),
+                    children=tuple(pack_data.get('actions') or ())  # List of action IDs
+                ))
+        return entries
+
+    # The accessors below read from the current catalog. Handlers that make
+    # several lookups should hold on to `self.catalog` for a consistent view.
+
+    @property
+    def actions(self) -> Sequence[CatalogEntry]:
+        return self.catalog.actions
+
     def get_all(self) -> Dict[str, Any]:
         """Get all loaded actions"""
-        return {
-            "agents": self.agents,
-            "rules": self.rules,
-            "mcps": self.mcps
-        }
-    
-    def get_agents(self) -> List[Agent]:
+        return self.catalog.get_all()
+
+    def get_agents(self) -> Sequence[AgentView]:
         """Get all agents"""
-        return self.agents
-    
-    def get_rules(self) -> List[Rule]:
+        return self.catalog.get_agents()
+
+    def get_rules(self) -> Sequence[RuleView]:
         """Get all rules"""
-        return self.rules
-    
-    def get_mcps(self) -> List[MCP]:
+        return self.catalog.get_rules()
+
+    def get_mcps(self) -> Sequence[MCPView]:
         """Get all MCPs"""
-        return self.mcps
-    
-    def get_agent_by_slug(self, slug: str) -> Agent:
+        return self.catalog.get_mcps()
+
+    def get_packs(self) -> Sequence[PackView]:
+        """Get all packs"""
+        return self.catalog.get_packs()
+
+    def get_agent_by_slug(self, slug: str) -> Optional[AgentView]:
         """Get a specific agent by slug"""
-        return next((a for a in self.agents if a.slug == slug), None)
-    
-    def get_rule_by_slug(self, slug: str) -> Rule:
+        return self.catalog.get_agent_by_slug(slug)
+
+    def get_rule_by_slug(self, slug: str) -> Optional[RuleView]:
         """Get a specific rule by slug"""
-        return next((r for r in self.rules if r.slug == slug), None)
-    
-    def load_packs(self):
-        """Load all packs from packs.yaml"""
-        packs_file = self.actions_dir / "packs.yaml"
-        if packs_file.exists():
-            with open(packs_file, 'r') as f:
-                data = yaml.safe_load(f)
-                if data and 'packs' in data:
-                    for pack_data in data['packs']:
-                        pack_id = pack_data.get('id', '')
-                        # Create Action object
-                        action = Action(
-                            id=pack_id,
-                            name=pack_data.get('name', ''),
-                            display_name=pack_data.get('display_name'),
-                            action_type=ActionType.PACK,
-                            tags=pack_data.get('tags', []),
-                            children=pack_data.get('actions', [])
-                        )
-                        self.actions.append(action)
-                        
-                        # Also create Pack for backward compatibility
-                        self.packs.append(Pack(
-                            id=pack_id,
-                            name=pack_data.get('name', ''),
-                            display_name=pack_data.get('display_name'),
-                            tags=pack_data.get('tags', []),
-                            description=pack_data.get('description'),
-                            actions=pack_data.get('actions', [])
-                        ))
-        else:
-            self.packs = []
-    
-    def get_packs(self) -> List[Pack]:
-        """Get all packs"""
-        return self.packs
-    
-    def get_actions(self, action_type: Optional[ActionType] = None, tags: Optional[List[str]] = None, 
-                   limit: int = 30, offset: int = 0) -> List[Action]:
+        return self.catalog.get_rule_by_slug(slug)
+
+    def get_actions(self, action_type: Optional[ActionType] = None, tags: Optional[List[str]] = None,
+                   limit: int = 30, offset: int = 0) -> List[CatalogEntry]:
         """Get all actions with optional filtering"""
-        filtered = self.actions
-        
-        # Filter by action type
-        if action_type:
-            filtered = [a for a in filtered if a.action_type == action_type]
-        
-        # Filter by tags
-        if tags:
-            filtered = [a for a in filtered if a.tags and any(tag in a.tags for tag in tags)]
-        
-        # Apply pagination
-        return filtered[offset:offset + limit]
-    
-    def get_action_by_id(self, action_id: str) -> Optional[Action]:
+        return self.catalog.get_actions(action_type, tags, limit, offset)
+
+    def query_actions(self, action_type: Optional[ActionType] = None, tags: Optional[List[str]] = None,
+                      limit: int = 30, offset: int = 0, cursor: Optional[str] = None) -> ActionsPage:
+        """Get one page of filtered actions together with the exact total"""
+        return self.catalog.query_actions(action_type, tags, limit, offset, cursor)
+
+    def get_action_by_id(self, action_id: str) -> Optional[CatalogEntry]:
         """Get a specific action by ID"""
-        return next((a for a in self.actions if a.id == action_id), None)
-    
-    def get_agent(self, action_id: str) -> Optional[Dict[str, Any]]:
+        return self.catalog.get_action_by_id(action_id)
+
+    def get_agent(self, action_id: str) -> Optional[AgentView]:
         """Get agent data by ID for legacy compatibility"""
-        action = self.get_action_by_id(action_id)
-        if action and action.action_type == ActionType.AGENT:
-            return {
-                'name': action.name,
-                'display_name': action.display_name,
-                'slug': action.id,
-                'filename': action.filename,
-                'content': action.content,
-                'tags': action.tags
-            }
-        return None
-    
-    def get_rule(self, action_id: str) -> Optional[Dict[str, Any]]:
+        return self.catalog.get_agent(action_id)
+
+    def get_rule(self, action_id: str) -> Optional[RuleView]:
         """Get rule data by ID for legacy compatibility"""
-        action = self.get_action_by_id(action_id)
-        if action and action.action_type in [ActionType.RULE, ActionType.RULESET]:
-            return {
-                'name': action.name,
-                'display_name': action.display_name,
-                'slug': action.id,
-                'content': action.content,
-                'tags': action.tags,
-                'type': action.action_type.value.lower()
-            }
-        return None
-    
-    def get_mcp(self, action_id: str) -> Optional[Dict[str, Any]]:
+        return self.catalog.get_rule(action_id)
+
+    def get_mcp(self, action_id: str) -> Optional[MCPView]:
         """Get MCP data by ID for legacy compatibility"""
-        action = self.get_action_by_id(action_id)
-        if action and action.action_type == ActionType.MCP:
-            return {
-                'name': action.name,
-                'display_name': action.display_name,
-                'slug': action.id,
-                'config': action.config,
-                'tags': action.tags,
-                'description': action.description
-            }
-        return None
+        return self.catalog.get_mcp(action_id)
 
 # Create singleton instance
-actions_loader = ActionsLoader()
\ No newline at end of file
+actions_loader = ActionsLoader()
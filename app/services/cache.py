@@ -0,0 +1,194 @@
+"""
+Small in-process and on-disk caches shared by the services.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from loguru import logger
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded LRU cache with an optional TTL and hit/miss counters.
+
+    Thread-safe, so it can be shared between the event loop and worker
+    threads. Entries older than `ttl` seconds are treated as misses.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                stored_at, value = item
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class DiskCache:
+    """Compressed text values in one SQLite file, evicted least recently used first.
+
+    Each value keeps the wall-clock time it was stored at, so ages survive
+    restarts. Blocking; call it from a worker thread.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " size INTEGER NOT NULL, body BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """(stored_at, value) of a key, or None"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT stored_at, body FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        stored_at, body = row
+        return stored_at, zlib.decompress(body).decode("utf-8")
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None):
+        body = zlib.compress(value.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, stored_at, accessed_at, size, body) VALUES (?, ?, ?, ?, ?)",
+                (key, now if stored_at is None else stored_at, now, len(body), body)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the file fits its budget"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        logger.info(f"Evicted {len(doomed)} entries from {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"path": str(self.path), "entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+
+class PersistentCache:
+    """An LRUCache in front of an optional DiskCache, for text values.
+
+    Disk errors are logged and treated as misses, so a broken or read-only
+    cache file never fails a request.
+    """
+
+    def __init__(self, path: Optional[str], max_bytes: int, memory_items: int):
+        self.memory = LRUCache(maxsize=memory_items)
+        self.disk = DiskCache(Path(path), max_bytes) if path else None
+
+    async def get_entry(self, key: str) -> Optional[Tuple[float, str]]:
+        """(stored_at, value) from the first tier holding the key, or None"""
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            try:
+                entry = await asyncio.to_thread(self.disk.get, key)
+            except (sqlite3.Error, zlib.error) as e:
+                logger.warning(f"Cache read from {self.disk.path} failed for {key}: {e}")
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    async def set(self, key: str, value: str):
+        stored_at = time.time()
+        self.memory.set(key, (stored_at, value))
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, stored_at)
+            except sqlite3.Error as e:
+                logger.warning(f"Cache write to {self.disk.path} failed for {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            try:
+                stats["disk"] = self.disk.stats()
+            except sqlite3.Error as e:
+                stats["disk"] = {"error": str(e)}
+        return stats
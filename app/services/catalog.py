@@ -0,0 +1,394 @@
+"""
+Immutable, indexed view of the loaded actions.
+
+A Catalog is built once from the parsed categories and never mutated
+afterwards; reloading builds a new Catalog and swaps it in. Request handlers
+should grab `actions_loader.catalog` once and use it for the whole request
+so they see a consistent set of actions.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.models.actions import Action, ActionType
+from app.models.catalog import (
+    AgentView,
+    CatalogEntry,
+    EntryViews,
+    MCPView,
+    PackView,
+    RuleView
+)
+from app.services.content_store import ContentStore
+from loguru import logger
+
+# Maximum number of resolved tag filters kept between requests
+FILTER_CACHE_SIZE = 256
+
+# Action types whose children are expanded on generate
+CONTAINER_TYPES = (ActionType.RULESET, ActionType.PACK)
+
+# Category file each action type is loaded from
+CATEGORY_BY_TYPE = {
+    ActionType.AGENT: "agents",
+    ActionType.RULE: "rules",
+    ActionType.RULESET: "rules",
+    ActionType.MCP: "mcps",
+    ActionType.PACK: "packs",
+}
+
+
+class CategoryData(NamedTuple):
+    """Entries parsed from one category file"""
+    digest: Optional[str]
+    entries: Tuple[CatalogEntry, ...]
+    # Set when bodies were moved out of the entries (mmap storage mode)
+    contents: Optional[ContentStore] = None
+
+    @property
+    def content_of(self) -> Optional[Callable[[str], Optional[str]]]:
+        return self.contents.get if self.contents else None
+
+
+class ActionsPage(NamedTuple):
+    """One page of a filtered action query"""
+    actions: List[CatalogEntry]
+    total: int
+    next_cursor: Optional[str]
+
+
+def encode_cursor(position: int, action_id: str) -> str:
+    """Encode the ordering key of the last returned action as an opaque cursor"""
+    raw = json.dumps([position, action_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position, action_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(position, int) or not isinstance(action_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return position, action_id
+
+
+class Catalog:
+    def __init__(self, categories: Dict[str, CategoryData], precomputed: Optional[Dict[str, Any]] = None):
+        """Assemble the catalog from parsed categories, in load order.
+
+        Args:
+            categories: Parsed data keyed by category name
+            precomputed: Type and tag indexes from a fresh compiled snapshot
+        """
+        self.categories = categories
+        self.actions: Tuple[CatalogEntry, ...] = tuple(
+            entry for data in categories.values() for entry in data.entries
+        )
+        # Legacy lists are views over the same entries, nothing is copied
+        self.agents = self._views("agents", AgentView)
+        self.rules = self._views("rules", RuleView)
+        self.mcps = self._views("mcps", MCPView)
+        self.packs = self._views("packs", PackView)
+
+        # Content-level version: changes whenever any source file changes
+        fingerprint = "|".join(f"{name}:{data.digest}" for name, data in categories.items())
+        self.version = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+        self._build_indexes(precomputed)
+        self._build_closures()
+
+        # Derived structures (search indexes...) built once per catalog
+        self._artifacts: Dict[str, Any] = {}
+        self._artifacts_lock = threading.Lock()
+
+    def _views(self, category: str, view: type) -> EntryViews:
+        data = self.categories[category]
+        return EntryViews(data.entries, view, data.content_of)
+
+    def _view(self, entry: CatalogEntry, view: type):
+        return view(entry, self.categories[CATEGORY_BY_TYPE[entry.action_type]].content_of)
+
+    def _build_indexes(self, precomputed: Optional[Dict[str, Any]] = None):
+        """Build id, type and tag indexes over the loaded actions.
+
+        Type and tag indexes are posting lists of positions in self.actions,
+        kept in ascending order so filtered results preserve catalog order.
+        """
+        self._by_id: Dict[str, CatalogEntry] = {}
+        self._by_type: Dict[ActionType, List[int]] = {}
+        self._by_tag: Dict[str, List[int]] = {}
+        self._position_by_id: Dict[str, int] = {}
+        self._filter_cache: "OrderedDict[Tuple, Sequence[int]]" = OrderedDict()
+        for position, entry in enumerate(self.actions):
+            # First occurrence wins, matching the previous linear scan
+            self._by_id.setdefault(entry.id, entry)
+            self._position_by_id.setdefault(entry.id, position)
+            if precomputed is None:
+                self._by_type.setdefault(entry.action_type, []).append(position)
+                for tag in set(entry.tags or ()):
+                    self._by_tag.setdefault(tag, []).append(position)
+        if precomputed is not None:
+            # JSON object keys are strings, so type keys are mapped back to ActionType
+            self._by_type = {ActionType(t): positions for t, positions in precomputed["types"].items()}
+            self._by_tag = precomputed["tags"]
+
+        self._agents_by_slug: Dict[str, CatalogEntry] = {}
+        for entry in self.categories["agents"].entries:
+            self._agents_by_slug.setdefault(entry.id, entry)
+        self._rules_by_slug: Dict[str, CatalogEntry] = {}
+        for entry in self.categories["rules"].entries:
+            self._rules_by_slug.setdefault(entry.id, entry)
+
+    def _build_closures(self):
+        """Precompute the transitive expansion of every ruleset and pack.
+
+        Each closure is the ordered, de-duplicated list of ids a selection of
+        the container expands to: the container itself when it has content
+        of its own, then its children depth-first in declaration order.
+        Cycles and unknown children are logged once here and skipped.
+        """
+        self._closures: Dict[str, Tuple[str, ...]] = {}
+        # Containers on the current path, by depth
+        visiting: Dict[str, int] = {}
+
+        def closure(entry: CatalogEntry) -> Tuple[Tuple[str, ...], int]:
+            """Closure of a container and the shallowest depth a cut back-edge pointed to.
+
+            A closure that skipped a back-edge to one of its ancestors is
+            truncated for that path only, so it is not memoized; the
+            ancestor's own closure is complete.
+            """
+            if entry.id in self._closures:
+                return self._closures[entry.id], len(visiting)
+            depth = len(visiting)
+            visiting[entry.id] = depth
+            cut = depth
+            ids = [entry.id] if self.has_content(entry) else []
+            for child_id in entry.children or ():
+                child = self._by_id.get(child_id)
+                if child is None:
+                    logger.warning(f"{entry.action_type.value} {entry.id} references unknown action {child_id}")
+                elif child_id in visiting:
+                    logger.warning(f"Cycle detected: {entry.id} -> {child_id}, skipping")
+                    cut = min(cut, visiting[child_id])
+                elif child.action_type in CONTAINER_TYPES:
+                    child_ids, child_cut = closure(child)
+                    ids.extend(child_ids)
+                    cut = min(cut, child_cut)
+                else:
+                    ids.append(child_id)
+            del visiting[entry.id]
+            result = tuple(dict.fromkeys(ids))
+            if cut >= depth:
+                self._closures[entry.id] = result
+            return result, cut
+
+        for entry in self.actions:
+            if entry.action_type in CONTAINER_TYPES and self._by_id.get(entry.id) is entry:
+                closure(entry)
+
+    def expand_selection(self, action_ids: List[str]) -> List[CatalogEntry]:
+        """Resolve selected ids to entries, expanding rulesets and packs.
+
+        Uses the precomputed closures, so the cost is proportional to the
+        expanded output. Unknown ids are ignored and shared children are
+        returned once, in first-seen order.
+        """
+        seen = set()
+        selected = []
+        for action_id in action_ids:
+            expanded = self._closures.get(action_id)
+            if expanded is None:
+                expanded = (action_id,) if action_id in self._by_id else ()
+            for expanded_id in expanded:
+                if expanded_id not in seen:
+                    seen.add(expanded_id)
+                    selected.append(self._by_id[expanded_id])
+        return selected
+
+    def artifact(self, name: str, factory: Callable[["Catalog"], Any]) -> Any:
+        """Get a structure derived from this catalog, building it on first use.
+
+        Since the catalog never changes, the result lives exactly as long as
+        it does and a reload naturally starts from scratch.
+        """
+        artifact = self._artifacts.get(name)
+        if artifact is None:
+            with self._artifacts_lock:
+                artifact = self._artifacts.get(name)
+                if artifact is None:
+                    artifact = factory(self)
+                    self._artifacts[name] = artifact
+        return artifact
+
+    def export_indexes(self) -> Dict[str, Any]:
+        """Indexes in the JSON-friendly shape stored in compiled snapshots"""
+        return {
+            "types": {t.value: positions for t, positions in self._by_type.items()},
+            "tags": self._by_tag
+        }
+
+    def _filtered_positions(self, action_type: Optional[ActionType] = None,
+                            tags: Optional[List[str]] = None) -> Sequence[int]:
+        """Resolve filters to an ascending sequence of positions in self.actions.
+
+        Type-only and unfiltered queries reuse the index directly; tag unions
+        are materialized once and kept in a small LRU so that paging through
+        the same filter does not recompute them.
+        """
+        if not tags:
+            if action_type:
+                return self._by_type.get(action_type, [])
+            return range(len(self.actions))
+
+        key = (action_type, frozenset(tags))
+        cached = self._filter_cache.get(key)
+        if cached is not None:
+            self._filter_cache.move_to_end(key)
+            return cached
+
+        # Union of the tag posting lists (any tag matches)
+        matched = set()
+        for tag in tags:
+            matched.update(self._by_tag.get(tag, ()))
+        if action_type:
+            matched.intersection_update(self._by_type.get(action_type, ()))
+        positions = sorted(matched)
+
+        self._filter_cache[key] = positions
+        if len(self._filter_cache) > FILTER_CACHE_SIZE:
+            self._filter_cache.popitem(last=False)
+        return positions
+
+    def get_content(self, entry: CatalogEntry) -> Optional[str]:
+        """Get the body of an entry, reading it from the content store if needed"""
+        if entry.content is not None:
+            return entry.content
+        return self.category_content(CATEGORY_BY_TYPE[entry.action_type], entry.id)
+
+    def has_content(self, entry: CatalogEntry) -> bool:
+        """True if the entry has a body, without decoding it"""
+        if entry.content is not None:
+            return True
+        store = self.categories[CATEGORY_BY_TYPE[entry.action_type]].contents
+        return store is not None and entry.id in store
+
+    def category_content(self, category: str, key: str) -> Optional[str]:
+        """Get a body from a category's content store (mmap storage mode only)"""
+        store = self.categories[category].contents
+        return store.get(key) if store else None
+
+    def to_action(self, entry: CatalogEntry) -> Action:
+        """Build the API model for an entry, with its body filled in"""
+        return entry.to_action(self.get_content(entry))
+
+    def get_all(self) -> Dict[str, Any]:
+        """Get all loaded actions"""
+        return {
+            "agents": self.agents,
+            "rules": self.rules,
+            "mcps": self.mcps
+        }
+
+    def get_agents(self) -> Sequence[AgentView]:
+        """Get all agents"""
+        return self.agents
+
+    def get_rules(self) -> Sequence[RuleView]:
+        """Get all rules"""
+        return self.rules
+
+    def get_mcps(self) -> Sequence[MCPView]:
+        """Get all MCPs"""
+        return self.mcps
+
+    def get_packs(self) -> Sequence[PackView]:
+        """Get all packs"""
+        return self.packs
+
+    def get_agent_by_slug(self, slug: str) -> Optional[AgentView]:
+        """Get a specific agent by slug"""
+        entry = self._agents_by_slug.get(slug)
+        return self._view(entry, AgentView) if entry else None
+
+    def get_rule_by_slug(self, slug: str) -> Optional[RuleView]:
+        """Get a specific rule by slug"""
+        entry = self._rules_by_slug.get(slug)
+        return self._view(entry, RuleView) if entry else None
+
+    def get_actions(self, action_type: Optional[ActionType] = None, tags: Optional[List[str]] = None,
+                    limit: int = 30, offset: int = 0) -> List[CatalogEntry]:
+        """Get all actions with optional filtering"""
+        positions = self._filtered_positions(action_type, tags)
+
+        # Apply pagination
+        return [self.actions[i] for i in positions[offset:offset + limit]]
+
+    def query_actions(self, action_type: Optional[ActionType] = None, tags: Optional[List[str]] = None,
+                      limit: int = 30, offset: int = 0, cursor: Optional[str] = None) -> ActionsPage:
+        """Get one page of filtered actions together with the exact total.
+
+        Actions are ordered by their catalog position. When a cursor from a
+        previous page is given it takes precedence over offset, and the page
+        start is found by bisecting the filtered positions, so deep pages
+        cost the same as the first one.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        positions = self._filtered_positions(action_type, tags)
+        total = len(positions)
+
+        start = offset
+        if cursor:
+            position, action_id = decode_cursor(cursor)
+            # Re-anchor on the id in case the catalog was reloaded since
+            position = self._position_by_id.get(action_id, position)
+            start = bisect_right(positions, position)
+
+        page_positions = positions[start:start + limit]
+        page = [self.actions[i] for i in page_positions]
+
+        next_cursor = None
+        if start + limit < total and page:
+            next_cursor = encode_cursor(page_positions[-1], page[-1].id)
+
+        return ActionsPage(actions=page, total=total, next_cursor=next_cursor)
+
+    def get_action_by_id(self, action_id: str) -> Optional[CatalogEntry]:
+        """Get a specific action by ID"""
+        return self._by_id.get(action_id)
+
+    def position_of(self, action_id: str) -> Optional[int]:
+        """Position of an action in self.actions, for position-keyed indexes"""
+        return self._position_by_id.get(action_id)
+
+    def get_agent(self, action_id: str) -> Optional[AgentView]:
+        """Get agent data by ID for legacy compatibility"""
+        entry = self.get_action_by_id(action_id)
+        if entry and entry.action_type == ActionType.AGENT:
+            return self._view(entry, AgentView)
+        return None
+
+    def get_rule(self, action_id: str) -> Optional[RuleView]:
+        """Get rule data by ID for legacy compatibility"""
+        entry = self.get_action_by_id(action_id)
+        if entry and entry.action_type in [ActionType.RULE, ActionType.RULESET]:
+            return self._view(entry, RuleView)
+        return None
+
+    def get_mcp(self, action_id: str) -> Optional[MCPView]:
+        """Get MCP data by ID for legacy compatibility"""
+        entry = self.get_action_by_id(action_id)
+        if entry and entry.action_type == ActionType.MCP:
+            return self._view(entry, MCPView)
+        return None
@@ -0,0 +1,138 @@
+"""
+Compiled catalog snapshot for fast startup.
+
+The snapshot is a single file next to the action YAML files. Its first line
+is a JSON header carrying the format version, a SHA-256 checksum of the body
+and the digest of every YAML source it was compiled from. The body is the
+parsed YAML documents plus the precomputed type and tag indexes.
+
+A category is only served from the snapshot while the digest of its YAML
+file still matches, so a stale snapshot can never shadow an edited file.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+from loguru import logger
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_FILENAME = "catalog.snapshot"
+
+# Category name -> source file, in catalog load order
+CATEGORY_FILES = {
+    "agents": "agents.yaml",
+    "rules": "rules.yaml",
+    "mcps": "mcps.yaml",
+    "packs": "packs.yaml",
+}
+
+# Use the libyaml C loader when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(path: Path) -> Any:
+    """Parse a YAML file with the fastest available safe loader"""
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """SHA-256 of a file's bytes, or None if the file does not exist"""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def source_digests(actions_dir: Path) -> Dict[str, Optional[str]]:
+    """Digest of every category source file"""
+    return {
+        category: file_digest(actions_dir / filename)
+        for category, filename in CATEGORY_FILES.items()
+    }
+
+
+class CatalogSnapshot:
+    """A validated snapshot loaded from disk"""
+
+    def __init__(self, sources: Dict[str, Optional[str]], documents: Dict[str, Any],
+                 indexes: Dict[str, Any]):
+        self.sources = sources
+        self.documents = documents
+        self.indexes = indexes
+
+    def document(self, category: str, digest: Optional[str]) -> Any:
+        """Return the parsed document for a category if it is still fresh.
+
+        A category whose file was absent at compile time and still is has no
+        document; None is returned for it.
+
+        Raises:
+            KeyError: If the source changed since the snapshot was compiled
+        """
+        if self.sources.get(category) != digest:
+            raise KeyError(category)
+        if digest is None:
+            return None
+        if category not in self.documents:
+            raise KeyError(category)
+        return self.documents[category]
+
+    def is_fresh(self, digests: Dict[str, Optional[str]]) -> bool:
+        """True if every category source matches the snapshot"""
+        return all(self.sources.get(category) == digest for category, digest in digests.items())
+
+
+def write_snapshot(actions_dir: Path, documents: Dict[str, Any], indexes: Dict[str, Any],
+                   sources: Dict[str, Optional[str]]) -> Path:
+    """Write a snapshot atomically and return its path"""
+    body = json.dumps(
+        {"documents": documents, "indexes": indexes},
+        separators=(',', ':'),
+        ensure_ascii=False
+    ).encode('utf-8')
+    header = json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "checksum": hashlib.sha256(body).hexdigest(),
+        "sources": sources,
+    }, separators=(',', ':')).encode('utf-8')
+
+    path = actions_dir / SNAPSHOT_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header + b"\n" + body)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(actions_dir: Path) -> Optional[CatalogSnapshot]:
+    """Read and verify the snapshot, returning None if missing or unusable"""
+    path = actions_dir / SNAPSHOT_FILENAME
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    try:
+        header_raw, body = raw.split(b"\n", 1)
+        header = json.loads(header_raw)
+        if header.get("format") != SNAPSHOT_FORMAT:
+            logger.warning(f"Ignoring snapshot {path}: format {header.get('format')} != {SNAPSHOT_FORMAT}")
+            return None
+        if hashlib.sha256(body).hexdigest() != header.get("checksum"):
+            logger.warning(f"Ignoring snapshot {path}: checksum mismatch")
+            return None
+        data = json.loads(body)
+    except ValueError as e:
+        logger.warning(f"Ignoring snapshot {path}: {e}")
+        return None
+
+    return CatalogSnapshot(
+        sources=header.get("sources", {}),
+        documents=data.get("documents", {}),
+        indexes=data.get("indexes", {})
+    )
@@ -0,0 +1,59 @@
+"""
+Out-of-heap storage for action bodies.
+
+In "mmap" storage mode the loader moves every action's markdown content into
+a ContentStore: an anonymous temporary file holding the UTF-8 bodies back to
+back, memory-mapped once the category is loaded. Actions then keep only
+metadata on the heap and the body is decoded from its (offset, length) slice
+when a listing page, detail view or generate request needs it. Mapped pages
+are file-backed and clean, so the OS can drop them under memory pressure.
+"""
+
+import mmap
+import tempfile
+from typing import Dict, Optional, Tuple
+
+CONTENT_STORAGE_MODES = ("memory", "mmap")
+
+
+class ContentStore:
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(prefix="gitrules-content-")
+        self._refs: Dict[str, Tuple[int, int]] = {}
+        self._size = 0
+        self._map: Optional[mmap.mmap] = None
+
+    def add(self, key: str, text: str) -> Tuple[int, int]:
+        """Append a body and return its (offset, length); the first body per key wins"""
+        if key in self._refs:
+            return self._refs[key]
+        data = text.encode('utf-8')
+        ref = (self._size, len(data))
+        self._file.write(data)
+        self._size += len(data)
+        self._refs[key] = ref
+        return ref
+
+    def freeze(self):
+        """Finish writing and map the blob read-only"""
+        self._file.flush()
+        if self._size:
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    def get(self, key: str) -> Optional[str]:
+        """Decode the body stored under key, or None if there is none"""
+        ref = self._refs.get(key)
+        if ref is None or self._map is None:
+            return None
+        offset, length = ref
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._refs
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    @property
+    def nbytes(self) -> int:
+        return self._size
@@ -0,0 +1,237 @@
+"""
+Token-budgeted repository context for recommendations.
+
+A gitingest digest (remote or local) is split into its per-file segments,
+each scored by how much it says about the tools a repository needs:
+manifests, READMEs, CI configs and entry points first, generated files,
+lockfiles and data last. Empty and duplicate files are dropped, and the
+best segments are packed into the token budget, counted with the model's
+tokenizer. The directory tree is kept but capped to a share of the budget.
+
+Tokens are counted with tiktoken, whose encoding files the Docker image
+fetches at build time (TIKTOKEN_CACHE_DIR). Elsewhere they are downloaded on
+first use; if that fails, or tiktoken is missing, tokens are estimated as 4
+characters each and a warning is logged.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+SEPARATOR = "=" * 48 + "\n"
+
+# Share of the budget the summary and directory tree may take
+TREE_SHARE = 0.15
+
+# A segment that does not fit whole is only cut down if this much remains
+MIN_PARTIAL_TOKENS = 200
+
+CHARS_PER_TOKEN = 4
+
+_FILE_HEADER = re.compile(rf"^{re.escape(SEPARATOR)}(?:FILE|File): (.+)\n{re.escape(SEPARATOR)}", re.MULTILINE)
+
+MANIFESTS = {
+    "package.json", "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "pipfile",
+    "cargo.toml", "go.mod", "gemfile", "pom.xml", "build.gradle", "build.gradle.kts",
+    "composer.json", "mix.exs", "pubspec.yaml", "deno.json", "environment.yml", "dockerfile",
+    "docker-compose.yml", "docker-compose.yaml", "compose.yaml", "makefile", "justfile"
+}
+
+CI_CONFIGS = (".github/workflows/", ".gitlab-ci.yml", ".circleci/", "jenkinsfile",
+              "azure-pipelines.yml", ".travis.yml", "bitbucket-pipelines.yml", ".pre-commit-config.yaml")
+
+ENTRY_POINTS = {
+    "main.py", "app.py", "__main__.py", "manage.py", "wsgi.py", "asgi.py", "server.py",
+    "index.js", "index.ts", "main.js", "main.ts", "server.js", "server.ts", "app.js", "app.ts",
+    "main.go", "main.rs", "lib.rs", "program.cs", "main.java", "application.java"
+}
+
+TOOL_CONFIGS = (
+    "tsconfig", ".eslintrc", "eslint.config", ".prettierrc", "ruff.toml", ".ruff.toml",
+    "mypy.ini", "tox.ini", "pytest.ini", "jest.config", "vite.config", "webpack.config",
+    "next.config", ".editorconfig", "turbo.json", "nx.json", "lerna.json", ".env.example",
+    "mcp.json", "claude.md", "agents.md", ".cursorrules"
+)
+
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".rb", ".php",
+    ".cs", ".swift", ".c", ".cc", ".cpp", ".h", ".hpp", ".scala", ".ex", ".exs", ".vue", ".svelte"
+}
+
+LOW_VALUE = (
+    "-lock.", ".lock", "go.sum", ".min.js", ".min.css", ".map", ".snap", ".svg", ".csv",
+    ".tsv", ".ipynb", "generated", "_pb2.py", ".pb.go", "migrations/", "fixtures/",
+    "vendor/", "node_modules/", "dist/", "build/", "license", "changelog", "__snapshots__/"
+)
+
+TEST_MARKERS = ("test/", "tests/", "spec/", "__tests__/", "_test.", ".test.", ".spec.", "test_")
+
+
+class Segment(NamedTuple):
+    path: str
+    content: str
+    score: float
+
+
+def path_priority(path: str) -> float:
+    """How much a file is likely to say about the tools a repository needs"""
+    lowered = path.lower()
+    name = lowered.rsplit("/", 1)[-1]
+    depth = lowered.count("/")
+
+    if any(marker in lowered for marker in LOW_VALUE):
+        return 0.5
+    if name.startswith("readme"):
+        return 100.0 if depth == 0 else 60.0 - 5 * depth
+    if name in MANIFESTS or name.startswith("requirements"):
+        return 95.0 - 10 * depth
+    if any(marker in lowered for marker in CI_CONFIGS):
+        return 80.0
+    if name.startswith(TOOL_CONFIGS):
+        return 70.0 - 5 * depth
+    if name in ENTRY_POINTS:
+        return 65.0 - 5 * depth
+    if any(marker in lowered for marker in TEST_MARKERS):
+        return 15.0 - depth
+    extension = os.path.splitext(name)[1]
+    if extension in SOURCE_EXTENSIONS:
+        return 40.0 - 4 * depth
+    if extension in (".md", ".rst", ".txt") or lowered.startswith("docs/"):
+        return 30.0 - 3 * depth
+    return 20.0 - 2 * depth
+
+
+class TokenCounter:
+    """Token counts with tiktoken when available, estimated otherwise"""
+
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                # Missing package or encoding files (fetched on first use)
+                logger.warning(f"tiktoken encoding {self.encoding_name} unavailable, estimating tokens: {e}")
+            self._loaded = True
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            self._load()
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """The longest prefix of text within the given number of tokens"""
+        if tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[:tokens * CHARS_PER_TOKEN]
+        encoded = self.encoding.encode(text, disallowed_special=())
+        if len(encoded) <= tokens:
+            return text
+        return self.encoding.decode(encoded[:tokens])
+
+
+def parse_digest(digest: str) -> Tuple[str, List[Segment]]:
+    """Split a digest into its header (summary and tree) and scored file segments"""
+    matches = list(_FILE_HEADER.finditer(digest))
+    if not matches:
+        return digest, []
+    header = digest[:matches[0].start()]
+    segments = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(digest)
+        path = match.group(1).strip()
+        content = digest[match.end():end].rstrip("\n")
+        segments.append(Segment(path, content, path_priority(path)))
+    return header, segments
+
+
+def _dedupe(segments: List[Segment]) -> List[Segment]:
+    """Drop empty files and exact duplicates (ignoring whitespace), keeping the best copy"""
+    seen = set()
+    kept = []
+    for segment in sorted(segments, key=lambda s: -s.score):
+        normalized = " ".join(segment.content.split())
+        if not normalized:
+            continue
+        digest = hashlib.sha1(normalized.encode()).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        kept.append(segment)
+    return kept
+
+
+def _format(segment_path: str, content: str) -> str:
+    return f"{SEPARATOR}File: {segment_path}\n{SEPARATOR}{content}\n\n"
+
+
+def build_context(digest: str, max_tokens: int, counter: Optional[TokenCounter] = None) -> str:
+    """
+    Pack the most useful parts of a digest into a token budget.
+
+    Args:
+        digest: Repository digest (summary, tree and FILE segments)
+        max_tokens: Token budget for the whole context
+        counter: Token counter (defaults to the one for the configured model)
+
+    Returns:
+        Header followed by the highest-value segments, best first
+    """
+    counter = counter or token_counter
+    header, segments = parse_digest(digest)
+    if not segments:
+        # Not a digest: plain truncation is all we can do
+        return counter.truncate(digest, max_tokens)
+
+    # Summary and tree, cut at a line boundary if they exceed their share
+    header_budget = int(max_tokens * TREE_SHARE)
+    if counter.count(header) > header_budget:
+        header = counter.truncate(header, header_budget)
+        header = header[:header.rfind("\n") + 1] + "... (tree truncated)\n\n"
+    remaining = max_tokens - counter.count(header)
+
+    parts = [header]
+    packed = 0
+    for segment in _dedupe(segments):
+        if remaining < MIN_PARTIAL_TOKENS:
+            break
+        block = _format(segment.path, segment.content)
+        tokens = counter.count(block)
+        if tokens > remaining:
+            # Only worth cutting down what we would rather keep than skip
+            if segment.score < 30:
+                continue
+            overhead = counter.count(_format(segment.path, "\n... (file truncated)"))
+            block = _format(segment.path, counter.truncate(segment.content, remaining - overhead) + "\n... (file truncated)")
+            tokens = counter.count(block)
+            if tokens > remaining:
+                continue
+        parts.append(block)
+        remaining -= tokens
+        packed += 1
+
+    logger.info(f"Packed {packed}/{len(segments)} files into {max_tokens - remaining}/{max_tokens} tokens")
+    return "".join(parts)
+
+
+# Create singleton instance (o200k_base is the gpt-4o family encoding)
+token_counter = TokenCounter(os.getenv("TOKENIZER_ENCODING", "o200k_base"))
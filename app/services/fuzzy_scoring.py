@@ -0,0 +1,156 @@
+"""
+Batched fuzzy scoring for SearchService.
+
+The per-item reference (`calculate_relevance` in benchmark_catalog.py) runs
+once per field per item, lower-casing both strings and running one
+partial_ratio each time. Here the
+searchable fields of a search group (agents, rules, MCPs) are normalized once
+per catalog into flat arrays, and a query is scored against a whole field in
+a single `rapidfuzz.process.cdist` call. Exact and substring bonuses and the
+per-field weights are then applied to the score matrix with NumPy.
+
+Bodies (the content field) are not copied: they stay in the catalog's
+ContentStore and only the bodies of the items being scored are read per
+query, which for searches is the index shortlist.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from app.models.actions import ActionType
+from app.services.catalog import Catalog
+
+
+class SearchGroup(NamedTuple):
+    action_types: Tuple[ActionType, ...]
+    # Field -> weight, max over fields is the relevance (as in SearchService)
+    weights: Dict[str, float]
+
+
+SEARCH_GROUPS = {
+    "agents": SearchGroup((ActionType.AGENT,), {"name": 1.0, "display_name": 1.0, "content": 0.5}),
+    "rules": SearchGroup((ActionType.RULE, ActionType.RULESET),
+                         {"name": 1.0, "display_name": 1.0, "content": 0.5, "author": 0.7, "tags": 1.0}),
+    "mcps": SearchGroup((ActionType.MCP,), {"name": 1.0, "config": 0.5}),
+}
+
+# Fields read from the catalog when scored instead of being kept normalized
+LAZY_FIELDS = {"content"}
+
+
+def field_values(catalog: Catalog, entry, field: str) -> List[str]:
+    """Lower-cased values of one searchable field of an entry"""
+    if field == "tags":
+        return [tag.lower() for tag in entry.tags or ()]
+    if field == "name":
+        value = entry.id
+    elif field == "content":
+        value = catalog.get_content(entry)
+    elif field == "config":
+        value = str(entry.config or {})
+    else:
+        value = getattr(entry, field)
+    return [(value or "").lower()]
+
+
+def relevance_scores(query: str, choices: Sequence[str], lengths: np.ndarray,
+                     workers: int = 1) -> np.ndarray:
+    """Score a lower-cased query against lower-cased choices in one native call.
+
+    Matches the per-item `calculate_relevance` for plain queries: 100 for an
+    exact match, 90 when the query is a substring, partial_ratio otherwise.
+    The bonuses fall out of partial_ratio itself, which is 100 exactly when
+    the shorter string occurs in the longer one, so only lengths are needed.
+    """
+    if not len(choices):
+        return np.zeros(0, dtype=np.float32)
+    scores = process.cdist([query], choices, scorer=fuzz.partial_ratio,
+                           dtype=np.float32, workers=workers)[0]
+    perfect = scores == 100
+    scores[perfect & (lengths > len(query))] = 90
+    return scores
+
+
+class FieldScorer:
+    """Normalized field arrays of one search group, scored in batch"""
+
+    def __init__(self, catalog: Catalog, group: SearchGroup):
+        self.catalog = catalog
+        self.weights = group.weights
+        self.positions = np.array(
+            [p for p, entry in enumerate(catalog.actions) if entry.action_type in group.action_types],
+            dtype=np.int64
+        )
+        self._row_of = {int(p): row for row, p in enumerate(self.positions)}
+
+        # Each field is a flat array of values plus the row each value belongs
+        # to, so multi-valued fields (tags) are scored in the same call
+        self._values: Dict[str, List[str]] = {}
+        self._owners: Dict[str, np.ndarray] = {}
+        self._lengths: Dict[str, np.ndarray] = {}
+        for field in self.weights:
+            if field in LAZY_FIELDS:
+                continue
+            values, owners = [], []
+            for row, position in enumerate(self.positions):
+                for value in field_values(catalog, catalog.actions[position], field):
+                    values.append(value)
+                    owners.append(row)
+            self._values[field] = values
+            self._owners[field] = np.array(owners, dtype=np.int64)
+            self._lengths[field] = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def score(self, query: str, positions: Optional[Sequence[int]] = None,
+              workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Relevance of every item of the group, or only of the given catalog positions.
+
+        Returns:
+            (catalog positions, relevance) arrays, in group order or in the
+            order the positions were given
+        """
+        query = query.lower()
+        if positions is None:
+            rows = None
+            selected = self.positions
+        else:
+            rows = np.array([self._row_of[p] for p in positions if p in self._row_of], dtype=np.int64)
+            selected = self.positions[rows]
+
+        relevance = np.zeros(len(selected), dtype=np.float32)
+        for field, weight in self.weights.items():
+            if field in LAZY_FIELDS:
+                values, owners, lengths = self._read(field, selected)
+            else:
+                values, owners, lengths = self._values[field], self._owners[field], self._lengths[field]
+            if rows is not None and field not in LAZY_FIELDS:
+                # Map owners into the selection and keep only the selected values
+                local = np.full(len(self.positions), -1, dtype=np.int64)
+                local[rows] = np.arange(len(rows))
+                owners = local[owners]
+                keep = np.flatnonzero(owners >= 0)
+                owners, lengths = owners[keep], lengths[keep]
+                values = [values[i] for i in keep]
+
+            scores = relevance_scores(query, values, lengths, workers) * weight
+            np.maximum.at(relevance, owners, scores)
+        return selected, relevance
+
+    def _read(self, field: str, positions: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Values, owners and lengths of a lazy field for the given catalog positions"""
+        values, owners = [], []
+        for row, position in enumerate(positions.tolist()):
+            for value in field_values(self.catalog, self.catalog.actions[position], field):
+                values.append(value)
+                owners.append(row)
+        lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+        return values, np.array(owners, dtype=np.int64), lengths
+
+
+def build_scorers(catalog: Catalog) -> Dict[str, FieldScorer]:
+    """One FieldScorer per search group (a catalog artifact)"""
+    return {name: FieldScorer(catalog, group) for name, group in SEARCH_GROUPS.items()}
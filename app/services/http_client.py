@@ -0,0 +1,164 @@
+"""
+Shared outbound HTTP client for the LLM and ingest calls.
+
+One httpx.AsyncClient is opened for the lifetime of the app (see the
+lifespan in app/main.py), so calls reuse pooled keep-alive connections and,
+when the h2 package is installed, multiplex over HTTP/2. Pool limits and
+timeouts come from the environment:
+
+    HTTP_MAX_CONNECTIONS       (default 100)
+    HTTP_MAX_KEEPALIVE         (default 20)
+    HTTP_KEEPALIVE_EXPIRY      seconds (default 30)
+    HTTP_CONNECT_TIMEOUT       seconds (default 10)
+    HTTP_MAX_RETRIES           retries after the first attempt (default 2)
+    HTTP_HTTP2                 "0" to disable HTTP/2 (default on)
+"""
+
+import asyncio
+import os
+import random
+from typing import Any, Awaitable, Optional, TypeVar
+
+import httpx
+from fastapi import Request
+from loguru import logger
+
+T = TypeVar("T")
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Backoff before retry n is uniform in [0, min(cap, base * 2**n)] ("full jitter")
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# How often a request is checked for a client disconnect
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SharedHTTPClient:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+
+    def _create(self) -> httpx.AsyncClient:
+        http2 = os.getenv("HTTP_HTTP2", "1") != "0" and _http2_available()
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        )
+        # Read/write/pool timeouts are set per request, connect stays bounded
+        timeout = httpx.Timeout(60.0, connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")))
+        logger.info(f"Opening shared HTTP client (http2={http2}, max_connections={limits.max_connections})")
+        return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled client, opened on first use outside the app lifespan"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create()
+        return self._client
+
+    async def start(self):
+        """Open the pool (called from the app lifespan)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create()
+
+    async def aclose(self):
+        """Close the pool and its connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None,
+                      max_retries: Optional[int] = None, stream: bool = False,
+                      **kwargs: Any) -> httpx.Response:
+        """Send a request through the pool, retrying transient failures.
+
+        Connection errors, timeouts and RETRY_STATUSES responses are retried
+        with jittered exponential backoff, or after the server's Retry-After
+        (capped). Any other response is returned as is, so
+        callers still call raise_for_status().
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            timeout: Timeout in seconds for this request (read, write and pool)
+            max_retries: Overrides HTTP_MAX_RETRIES
+            stream: Return before reading the body; the caller must aclose() it
+            **kwargs: Passed to httpx.AsyncClient.build_request
+        """
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=self.client.timeout.connect)
+        retries = self.max_retries if max_retries is None else max_retries
+
+        attempt = 0
+        while True:
+            try:
+                request = self.client.build_request(method, url, **kwargs)
+                response = await self.client.send(request, stream=stream)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = self._retry_after(response)
+                await response.aclose()
+                reason = f"HTTP {response.status_code}"
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                if attempt >= retries:
+                    raise
+                delay = None
+                reason = type(e).__name__
+
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            logger.warning(f"{method} {url} failed ({reason}), retry {attempt}/{retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            value = float(response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+        return min(max(value, 0.0), BACKOFF_CAP)
+
+
+class ClientDisconnected(Exception):
+    """The client went away before its response was ready"""
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Run awaitable, cancelling it if the HTTP client goes away first.
+
+    Long upstream calls (ingest, LLM) are abandoned instead of finishing for
+    nobody; the cancellation closes their pooled connection cleanly.
+
+    Raises:
+        ClientDisconnected: If the client disconnected
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {request.url.path}")
+                task.cancel()
+                raise ClientDisconnected(request.url.path)
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# Create singleton instance
+http_client = SharedHTTPClient()
@@ -0,0 +1,251 @@
+"""
+Two-tier cache of ingested repository contexts.
+
+Ingesting a repository through gitingest takes seconds to minutes, and the
+same popular repositories are recommended over and over. Contexts are cached
+under the normalized repository URL plus the commit its ref currently points
+to (resolved with `git ls-remote`), so a push invalidates the entry and an
+unchanged repository is never re-ingested. Only repositories on the hosts
+in INGEST_HOSTS are resolved or ingested, and at most LS_REMOTE_CONCURRENCY
+`git ls-remote` processes run at once.
+
+The first tier is an in-memory LRU of recent contexts. The second is a SQLite
+file of zlib-compressed contexts that survives restarts and is evicted least
+recently used first once it grows past its size budget. An entry is fresh for
+INGEST_CACHE_TTL seconds; after that it is still served for up to
+INGEST_CACHE_STALE more seconds while a background task re-ingests it.
+
+Settings (environment):
+
+    INGEST_CACHE_PATH          SQLite file, empty to keep memory only
+                               (default .cache/ingest.sqlite3)
+    INGEST_CACHE_MAX_BYTES     compressed size budget on disk (default 512 MiB)
+    INGEST_CACHE_MEMORY_ITEMS  contexts kept in memory (default 32)
+    INGEST_CACHE_TTL           seconds an entry is fresh (default 1 day)
+    INGEST_CACHE_STALE         seconds a stale entry may still be served (default 7 days)
+    INGEST_HOSTS               comma-separated hosts repositories may come from
+                               (default github.com)
+    LS_REMOTE_CONCURRENCY      git ls-remote processes run at once (default 8)
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from app.services.cache import LRUCache, PersistentCache
+from app.services.single_flight import SingleFlight, shared_lease
+
+# How long a resolved ref -> commit is trusted before asking the remote again
+REF_TTL = 60.0
+LS_REMOTE_TIMEOUT = 10.0
+LS_REMOTE_CONCURRENCY = int(os.getenv("LS_REMOTE_CONCURRENCY", "8"))
+
+# Hosts the ingesters support; anything else is refused before any subprocess runs
+INGEST_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("INGEST_HOSTS", "github.com").split(",") if host.strip()
+)
+
+_COMMIT = re.compile(r"^[0-9a-f]{40}$")
+
+
+class UnsupportedRepository(ValueError):
+    """Raised for a repository URL on a host that is not in INGEST_HOSTS"""
+
+
+def normalize_repo_url(url: str) -> Tuple[str, str]:
+    """Canonical repository URL and the ref it asks for.
+
+    "github.com/Owner/Repo.git/", "https://github.com/owner/repo" and
+    "https://github.com/owner/repo/tree/main" all name the same repository;
+    the ref is "HEAD" unless the URL points into a /tree/<ref>.
+
+    Returns:
+        (canonical URL, ref)
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    segments = [s for s in parts.path.split("/") if s]
+
+    ref = "HEAD"
+    if len(segments) > 3 and segments[2] in ("tree", "blob"):
+        ref = "/".join(segments[3:]) if segments[2] == "tree" else segments[3]
+    segments = segments[:2]
+    if segments and segments[-1].endswith(".git"):
+        segments[-1] = segments[-1][:-4]
+
+    # Owner and repository names are case-insensitive on the common forges
+    path = "/".join(segments).lower()
+    return f"https://{host.lower()}/{path}", ref
+
+
+def check_supported(canonical: str):
+    """Refuse a canonical repository URL the ingesters do not support.
+
+    Raises:
+        UnsupportedRepository: If its host is not in INGEST_HOSTS or it does
+            not name an owner and repository
+    """
+    parts = urlsplit(canonical)
+    if parts.hostname not in INGEST_HOSTS or len([s for s in parts.path.split("/") if s]) != 2:
+        hosts = ", ".join(sorted(INGEST_HOSTS))
+        raise UnsupportedRepository(
+            f"Unsupported repository URL {canonical}: expected https://<{hosts}>/<owner>/<repo>"
+        )
+
+
+async def resolve_commit(url: str, ref: str = "HEAD") -> Optional[str]:
+    """Commit a remote ref points to, or None if the remote cannot tell us"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            # Both come from the request URL: never let them parse as options
+            "git", "ls-remote", "--end-of-options", url, ref,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+    except OSError as e:
+        logger.warning(f"Cannot run git ls-remote: {e}")
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=LS_REMOTE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning(f"git ls-remote {url} {ref} timed out")
+        return None
+    if process.returncode != 0:
+        return None
+
+    # Prefer an exact ref match, then a branch, then a tag
+    commits = {}
+    for line in stdout.decode(errors="replace").splitlines():
+        sha, _, name = line.partition("\t")
+        if _COMMIT.match(sha):
+            commits[name] = sha
+    for name in (ref, f"refs/heads/{ref}", f"refs/tags/{ref}^{{}}", f"refs/tags/{ref}"):
+        if name in commits:
+            return commits[name]
+    if _COMMIT.match(ref):
+        return ref
+    return next(iter(commits.values()), None)
+
+
+class IngestCache:
+    def __init__(self):
+        self.ttl = float(os.getenv("INGEST_CACHE_TTL", str(24 * 3600)))
+        self.stale = float(os.getenv("INGEST_CACHE_STALE", str(7 * 24 * 3600)))
+        self.store = PersistentCache(
+            os.getenv("INGEST_CACHE_PATH", ".cache/ingest.sqlite3"),
+            max_bytes=int(os.getenv("INGEST_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+            memory_items=int(os.getenv("INGEST_CACHE_MEMORY_ITEMS", "32"))
+        )
+
+        self._commits = LRUCache(maxsize=1024, ttl=REF_TTL)
+        # Concurrent requests for one repository share one ls-remote and one ingest
+        self._resolving = SingleFlight("ls-remote")
+        # Distinct repositories are not coalesced: bound the subprocesses instead
+        self._ls_remote_slots = asyncio.Semaphore(LS_REMOTE_CONCURRENCY)
+        self._ingesting = SingleFlight("ingest", shared_lease())
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    async def key_for(self, url: str, variant: str = "") -> str:
+        """Cache key of a repository URL: canonical URL @ current commit [# variant]
+
+        Raises:
+            UnsupportedRepository: If the URL is not on a supported host
+        """
+        canonical, ref = normalize_repo_url(url)
+        check_supported(canonical)
+        commit = self._commits.get((canonical, ref))
+        if commit is None:
+            commit = await self._resolving.do(f"{canonical} {ref}", lambda: self._resolve(canonical, ref))
+            if commit is not None:
+                self._commits.set((canonical, ref), commit)
+        # Unresolvable remotes fall back to the ref and rely on the TTL alone
+        key = f"{canonical}@{commit or ref}"
+        return f"{key}#{variant}" if variant else key
+
+    async def _resolve(self, canonical: str, ref: str) -> Optional[str]:
+        async with self._ls_remote_slots:
+            return await resolve_commit(canonical, ref)
+
+    async def get_or_ingest(self, url: str, ingest: Callable[[str], Awaitable[str]],
+                            variant: str = "") -> str:
+        """Cached context of a repository, ingesting it on a miss.
+
+        Args:
+            url: Repository URL as given by the client
+            ingest: Fetches the full context of a URL
+            variant: Distinguishes contexts of one commit built differently
+
+        Returns:
+            The repository context as ingest returned it
+
+        Raises:
+            UnsupportedRepository: If the URL is not on a supported host
+        """
+        key = await self.key_for(url, variant)
+        cached = await self.store.get_entry(key)
+        if cached is not None:
+            stored_at, context = cached
+            age = time.time() - stored_at
+            if age < self.ttl:
+                return context
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                self._refresh_in_background(key, url, ingest)
+                return context
+
+        return await self._ingesting.do(key, lambda: self._ingest_once(key, url, ingest))
+
+    async def _ingest_once(self, key: str, url: str, ingest: Callable[[str], Awaitable[str]]) -> str:
+        """Ingest and store, unless another worker stored a fresh context meanwhile"""
+        cached = await self.store.get_entry(key)
+        if cached is not None and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        context = await ingest(url)
+        await self.store.set(key, context)
+        return context
+
+    def _refresh_in_background(self, key: str, url: str, ingest: Callable[[str], Awaitable[str]]):
+        """Re-ingest a stale entry once, without holding up the request"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._ingesting.do(key, lambda: self._ingest_once(key, url, ingest))
+                self.refreshes += 1
+                logger.info(f"Refreshed ingested context for {key}")
+            except Exception as e:
+                logger.warning(f"Background re-ingest of {key} failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.store.stats(),
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "single_flight": self._ingesting.stats()
+        }
+
+
+# Create singleton instance
+ingest_cache = IngestCache()
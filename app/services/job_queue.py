@@ -0,0 +1,401 @@
+"""
+Bounded background job queue.
+
+Expensive work (ingest plus an LLM call) is not run straight from request
+handlers: it is submitted as a job to a priority queue drained by a fixed
+number of async workers, so a traffic spike waits its turn instead of
+launching unbounded parallel upstream calls. Lower priority numbers run
+first, equal priorities in submission order. Once more than `max_depth`
+jobs are waiting, submissions are refused with QueueFull, which routes turn
+into 429 Too Many Requests. Spawned jobs (below) are bounded the same way:
+at most `max_depth` of them are tracked at once.
+
+Jobs submitted with a `persist` record are tracked in a JobStore (SQLite),
+so a client can poll for the result by id from any worker process until it
+expires. Jobs run for a waiting request are not stored; cancelling one that
+is still queued drops it, cancelling a running one cancels its work.
+
+Work made of several steps, each of which may be served from a cache, is
+better spawned as a tracked job that submits only its expensive steps:
+a job holding a worker while it waits on another queued job could wait
+forever once every worker does the same.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from loguru import logger
+
+# How often a client waiting on a job run by another process checks again
+POLL_INTERVAL = 0.5
+
+# Recent wait and run times kept for the stats
+TIMING_SAMPLES = 256
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit and spawn when too many jobs are already waiting"""
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"Job queue is full ({depth} jobs waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """Status and results of jobs in one SQLite file, dropped after `ttl` seconds.
+
+    Blocking; call it from a worker thread.
+    """
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, started_at REAL, finished_at REAL, expires_at REAL NOT NULL,"
+                " request TEXT NOT NULL, result TEXT, error TEXT, status_code INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def create(self, job_id: str, priority: int, request: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT INTO jobs (id, status, priority, created_at, expires_at, request) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, "queued", priority, now, now + self.ttl, json.dumps(request))
+            )
+            conn.commit()
+
+    def update(self, job_id: str, status: str, **fields: Any):
+        """Record a status change; finished jobs are kept `ttl` seconds from now"""
+        now = time.time()
+        values = {"status": status, "expires_at": now + self.ttl, **fields}
+        if status == "running":
+            values["started_at"] = now
+        elif status in ("succeeded", "failed", "cancelled"):
+            values["finished_at"] = now
+        columns = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values.values(), job_id))
+            conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, status, priority, created_at, started_at, finished_at, result, error, status_code"
+                " FROM jobs WHERE id = ? AND expires_at >= ?",
+                (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "status", "priority", "created_at", "started_at", "finished_at",
+                "result", "error", "status_code")
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class Job:
+    __slots__ = ("id", "priority", "fn", "future", "persist", "state", "task", "enqueued_at")
+
+    def __init__(self, fn: Callable[[], Awaitable[Any]], priority: int, persist: bool):
+        self.id = uuid.uuid4().hex
+        self.priority = priority
+        self.fn = fn
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.persist = persist
+        self.state = "queued"
+        self.task: Optional[asyncio.Task] = None
+        self.enqueued_at = time.monotonic()
+
+
+def _percentile(samples: Deque[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 3)
+
+
+class JobQueue:
+    def __init__(self, name: str, workers: int, max_depth: int, store: Optional[JobStore] = None):
+        self.name = name
+        self.workers = workers
+        self.max_depth = max_depth
+        self.store = store
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._spawned: Set[asyncio.Task] = set()
+        self._jobs: Dict[str, Job] = {}
+        self._order = itertools.count()
+        self._pending = 0
+        self._running = 0
+        self._tracked = 0  # Spawned jobs not yet finished
+        self._wait_times: Deque[float] = deque(maxlen=TIMING_SAMPLES)
+        self._run_times: Deque[float] = deque(maxlen=TIMING_SAMPLES)
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Start the workers (called from the app lifespan)"""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"{self.name}: started {self.workers} workers (queue bound {self.max_depth})")
+
+    async def aclose(self):
+        """Stop the workers, cancelling running and queued jobs"""
+        for worker in self._workers:
+            worker.cancel()
+        for task in self._spawned:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._spawned, return_exceptions=True)
+        self._workers = []
+        self._spawned.clear()
+        for job in list(self._jobs.values()):
+            job.future.cancel()
+        self._jobs.clear()
+        self._pending = 0
+        self._tracked = 0
+
+    def retry_after(self, depth: Optional[int] = None) -> int:
+        """Seconds until a backlog of depth jobs (default: the queued ones) is likely to have drained"""
+        run_time = sum(self._run_times) / len(self._run_times) if self._run_times else 10.0
+        depth = self._pending if depth is None else depth
+        return max(1, math.ceil(run_time * depth / self.workers))
+
+    async def submit(self, fn: Callable[[], Awaitable[Any]], priority: int = 0,
+                     persist: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue fn to run on a worker.
+
+        Args:
+            fn: Starts the work
+            priority: Lower runs first
+            persist: Request to record in the store, so the job can be polled by id
+
+        Returns:
+            The job; its future resolves to fn's result
+
+        Raises:
+            QueueFull: If max_depth jobs are already waiting
+        """
+        self._ensure_started()
+        if self._pending >= self.max_depth:
+            self.rejected += 1
+            raise QueueFull(self._pending, self.retry_after())
+
+        job = Job(fn, priority, persist is not None and self.store is not None)
+        # The slot is taken before yielding, so concurrent submits respect the bound
+        self._pending += 1
+        if job.persist:
+            try:
+                await asyncio.to_thread(self.store.create, job.id, priority, persist)
+            except BaseException:
+                self._pending -= 1
+                raise
+        self._jobs[job.id] = job
+        self.submitted += 1
+        self._queue.put_nowait((priority, next(self._order), job))
+        return job
+
+    async def spawn(self, fn: Callable[[], Awaitable[Any]], priority: int,
+                    persist: Dict[str, Any]) -> Job:
+        """
+        Track fn as a job without giving it a worker.
+
+        For work that submits its own expensive steps to this queue. It is
+        refused like a submission while the queue is full, so an accepted
+        job is unlikely to fail for lack of room, and while max_depth
+        spawned jobs are unfinished, so their cheap steps stay bounded too.
+
+        Raises:
+            QueueFull: If max_depth jobs are already waiting or spawned
+        """
+        self._ensure_started()
+        if self._pending >= self.max_depth or self._tracked >= self.max_depth:
+            self.rejected += 1
+            depth = max(self._pending, self._tracked)
+            raise QueueFull(depth, self.retry_after(depth))
+
+        job = Job(fn, priority, self.store is not None)
+        # Counted before yielding, so concurrent spawns respect the bound
+        self._tracked += 1
+        if job.persist:
+            try:
+                await asyncio.to_thread(self.store.create, job.id, priority, persist)
+            except BaseException:
+                self._tracked -= 1
+                raise
+        self._jobs[job.id] = job
+        self.submitted += 1
+        job.state = "running"
+
+        async def execute():
+            try:
+                await self._execute(job)
+            finally:
+                self._tracked -= 1
+                self._jobs.pop(job.id, None)
+                job.state = "done"
+
+        task = asyncio.create_task(execute())
+        self._spawned.add(task)
+        task.add_done_callback(self._spawned.discard)
+        return job
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], priority: int = 0) -> Any:
+        """Queue fn and wait for its result; cancelling the wait cancels the job"""
+        job = await self.submit(fn, priority)
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            self.cancel(job)
+            raise
+
+    def cancel(self, job: Job):
+        """Drop a queued job or cancel a running one"""
+        if job.state == "queued":
+            job.state = "cancelled"
+            self._pending -= 1
+            self._jobs.pop(job.id, None)
+            self.cancelled += 1
+            job.future.cancel()
+        elif job.state == "running" and job.task is not None:
+            job.task.cancel()
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Stored record of a job, once finished or after timeout seconds.
+
+        Returns:
+            The record (see JobStore.get), or None if unknown or expired
+        """
+        if self.store is None:
+            return None
+        deadline = time.monotonic() + timeout
+        job = self._jobs.get(job_id)
+        if job is not None and timeout > 0:
+            # Ours: woken as soon as it finishes
+            await asyncio.wait([job.future], timeout=timeout)
+        while True:
+            record = await asyncio.to_thread(self.store.get, job_id)
+            if record is None or record["status"] in ("succeeded", "failed", "cancelled"):
+                return record
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return record
+            # Run by another process: only the store can tell
+            await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+    async def _work(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.state != "queued":
+                continue
+            self._pending -= 1
+            self._running += 1
+            job.state = "running"
+            self._wait_times.append(time.monotonic() - job.enqueued_at)
+            started = time.monotonic()
+            try:
+                await self._execute(job)
+            finally:
+                if job.task is not None and not job.task.done():
+                    job.task.cancel()
+                self._run_times.append(time.monotonic() - started)
+                self._running -= 1
+                self._jobs.pop(job.id, None)
+                job.state = "done"
+
+    async def _execute(self, job: Job):
+        """Run one job, record its outcome, then settle its future"""
+        if job.persist:
+            await self._record(job, "running")
+        job.task = asyncio.ensure_future(job.fn())
+        # A worker being stopped cancels the job with it
+        await asyncio.wait([job.task])
+
+        # The record is written first: whoever the future wakes reads the final state
+        if job.task.cancelled():
+            self.cancelled += 1
+            if job.persist:
+                await self._record(job, "cancelled")
+            job.future.cancel()
+            return
+        error = job.task.exception()
+        if error is not None:
+            self.failed += 1
+            logger.warning(f"{self.name}: job {job.id} failed: {error}")
+            if job.persist:
+                detail = getattr(error, "detail", None) or str(error)
+                await self._record(job, "failed", error=str(detail),
+                                   status_code=getattr(error, "status_code", 500))
+            if not job.future.done():
+                job.future.set_exception(error)
+                # Observed here even if no one waits for the future
+                job.future.exception()
+            return
+        result = job.task.result()
+        self.succeeded += 1
+        if job.persist:
+            payload = result.model_dump() if hasattr(result, "model_dump") else result
+            await self._record(job, "succeeded", result=json.dumps(payload))
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _record(self, job: Job, status: str, **fields: Any):
+        try:
+            await asyncio.to_thread(self.store.update, job.id, status, **fields)
+        except sqlite3.Error as e:
+            logger.warning(f"{self.name}: failed to record job {job.id} as {status}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "depth": self._pending,
+            "max_depth": self.max_depth,
+            "running": self._running,
+            "spawned": self._tracked,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "wait_seconds": {"p50": _percentile(self._wait_times, 0.5), "p95": _percentile(self._wait_times, 0.95)},
+            "run_seconds": {"p50": _percentile(self._run_times, 0.5), "p95": _percentile(self._run_times, 0.95)}
+        }
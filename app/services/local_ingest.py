@@ -0,0 +1,255 @@
+"""
+Local repository ingestion, an alternative to the gitingest.com API.
+
+Works on a directory on disk or on a shallow clone of a remote repository
+and produces the same summary / tree / content layout as gitingest. The
+directory tree is listed level by level on a thread pool, pruning vendored
+and generated directories, lockfiles and binaries by name before they are
+ever opened. Files are then read on the same pool in priority order
+(READMEs, manifests, CI configs and entry points first, see
+context_builder), and reading stops as soon as the context budget is spent,
+so a huge repository costs no more than a small one.
+
+Settings (environment):
+
+    LOCAL_INGEST_ROOT     directory under which local paths may be ingested
+                          (unset: local paths are refused)
+    LOCAL_INGEST_WORKERS  threads listing and reading files (default 8)
+    CLONE_TIMEOUT         seconds allowed for a shallow clone (default 120)
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+from app.services.context_builder import SEPARATOR, path_priority
+from app.services.ingest_cache import normalize_repo_url
+
+# Same limit the gitingest.com request asks for
+MAX_FILE_SIZE = 102400
+
+# Bytes inspected for a NUL to tell binary files from text
+SNIFF_BYTES = 8192
+
+SKIP_DIRS = {
+    ".git", ".hg", ".svn", ".idea", ".vscode", ".venv", "venv", "env", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", "node_modules",
+    "bower_components", "vendor", "third_party", "dist", "build", "target", "out",
+    ".next", ".nuxt", ".gradle", ".terraform", "coverage", "site-packages", "Pods"
+}
+
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "Cargo.lock", "Gemfile.lock", "composer.lock",
+    "go.sum", "mix.lock", "pubspec.lock", "Podfile.lock", "flake.lock"
+}
+
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".tiff", ".psd",
+    ".pdf", ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".jar",
+    ".war", ".class", ".so", ".dll", ".dylib", ".exe", ".bin", ".o", ".a", ".lib",
+    ".pyc", ".pyo", ".whl", ".egg", ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".wav", ".ogg", ".mov", ".avi", ".webm", ".sqlite", ".sqlite3",
+    ".db", ".parquet", ".npy", ".npz", ".pkl", ".pt", ".onnx", ".h5", ".wasm"
+}
+
+MINIFIED_SUFFIXES = (".min.js", ".min.css", ".map")
+
+
+class RepoFile(NamedTuple):
+    path: str  # Relative, with forward slashes
+    absolute: str
+    size: int
+
+
+def _skip_file(name: str, size: int) -> bool:
+    if size > MAX_FILE_SIZE or name in LOCKFILES or name.endswith(MINIFIED_SUFFIXES):
+        return True
+    return os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS
+
+
+def _scan(directory: Tuple[str, str]) -> Tuple[List[Tuple[str, str]], List[RepoFile]]:
+    """Subdirectories and readable files of one directory (symlinks are not followed)"""
+    relative, absolute = directory
+    subdirs, files = [], []
+    try:
+        entries = sorted(os.scandir(absolute), key=lambda e: e.name)
+    except OSError as e:
+        logger.debug(f"Cannot list {absolute}: {e}")
+        return subdirs, files
+    for entry in entries:
+        path = f"{relative}/{entry.name}" if relative else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append((path, entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                size = entry.stat(follow_symlinks=False).st_size
+                if not _skip_file(entry.name, size):
+                    files.append(RepoFile(path, entry.path, size))
+        except OSError:
+            continue
+    return subdirs, files
+
+
+def walk(root: Path, pool: ThreadPoolExecutor) -> List[RepoFile]:
+    """Every candidate file under root, most useful first"""
+    found: List[RepoFile] = []
+    level = [("", str(root))]
+    while level:
+        next_level = []
+        for subdirs, files in pool.map(_scan, level):
+            next_level.extend(subdirs)
+            found.extend(files)
+        level = next_level
+    # Stable: keeps the breadth-first order among equals
+    found.sort(key=lambda f: -path_priority(f.path))
+    return found
+
+
+def _read(file: RepoFile) -> Optional[str]:
+    """Text of a file, or None for binaries and unreadable files"""
+    try:
+        with open(file.absolute, "rb") as f:
+            data = f.read(MAX_FILE_SIZE)
+    except OSError:
+        return None
+    if b"\0" in data[:SNIFF_BYTES]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def render_tree(name: str, paths: List[str]) -> str:
+    """gitingest-style directory tree of the given relative paths"""
+    root: Dict[str, dict] = {}
+    for path in paths:
+        node = root
+        for part in path.split("/"):
+            node = node.setdefault(part, {})
+
+    lines = ["Directory structure:", f"└── {name}/"]
+
+    def render(node: Dict[str, dict], prefix: str):
+        # Directories before files, each alphabetically
+        children = sorted(node.items(), key=lambda item: (not item[1], item[0]))
+        for i, (child, grandchildren) in enumerate(children):
+            last = i == len(children) - 1
+            lines.append(f"{prefix}{'└── ' if last else '├── '}{child}{'/' if grandchildren else ''}")
+            if grandchildren:
+                render(grandchildren, prefix + ("    " if last else "│   "))
+
+    render(root, "    ")
+    return "\n".join(lines)
+
+
+def _batches(files: List[RepoFile], size: int) -> Iterator[List[RepoFile]]:
+    for start in range(0, len(files), size):
+        yield files[start:start + size]
+
+
+def ingest_directory(root: Path, max_chars: int, label: Optional[str] = None) -> str:
+    """
+    Build a repository context from a directory, reading only what fits.
+
+    Args:
+        root: Repository checkout
+        max_chars: Context budget in characters
+        label: Repository name for the summary (defaults to the directory name)
+
+    Returns:
+        "summary\\n\\ntree\\n\\ncontent", at most about max_chars long
+    """
+    workers = int(os.getenv("LOCAL_INGEST_WORKERS", "8"))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+        files = walk(root, pool)
+        tree = render_tree(root.name, [f.path for f in files])
+
+        # The tree and summary come out of the same budget
+        budget = max(max_chars - len(tree) - 256, 0)
+        blocks: List[str] = []
+        used = 0
+        analyzed = 0
+        for batch in _batches(files, workers * 2):
+            if used >= budget:
+                break
+            for file, text in zip(batch, pool.map(_read, batch)):
+                if text is None:
+                    continue
+                block = f"{SEPARATOR}File: {file.path}\n{SEPARATOR}{text}\n\n"
+                if used + len(block) > budget:
+                    block = block[:budget - used] + "\n\n... (context truncated)\n"
+                blocks.append(block)
+                used += len(block)
+                analyzed += 1
+                if used >= budget:
+                    break
+
+    summary = f"Repository: {label or root.name}\nFiles analyzed: {analyzed}\n"
+    if analyzed < len(files):
+        summary += f"Files not read (context budget): {len(files) - analyzed}\n"
+    logger.info(f"Ingested {analyzed}/{len(files)} files from {root} ({used} characters)")
+    return f"{summary}\n\n{tree}\n\n{''.join(blocks)}"
+
+
+def local_path(url: str) -> Optional[Path]:
+    """The directory a local "URL" names, if it lies under LOCAL_INGEST_ROOT"""
+    root = os.getenv("LOCAL_INGEST_ROOT")
+    if not root:
+        return None
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    if not url.startswith(("/", ".", "~")):
+        return None
+    path = Path(url).expanduser().resolve()
+    if path.is_dir() and path.is_relative_to(Path(root).resolve()):
+        return path
+    return None
+
+
+async def _git(*args: str, cwd: str, timeout: float):
+    process = await asyncio.create_subprocess_exec(
+        "git", *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise Exception(f"git {args[0]} failed: {stderr.decode(errors='replace').strip()}")
+
+
+async def ingest_clone(url: str, max_chars: int) -> str:
+    """
+    Shallow-clone a remote repository and ingest it locally.
+
+    Only the requested ref (branch, tag or commit from a /tree/<ref> URL,
+    HEAD otherwise) is fetched, at depth 1.
+    """
+    canonical, ref = normalize_repo_url(url)
+    timeout = float(os.getenv("CLONE_TIMEOUT", "120"))
+    workdir = await asyncio.to_thread(tempfile.mkdtemp, prefix="gitrules-ingest-")
+    checkout = os.path.join(workdir, canonical.rsplit("/", 1)[-1] or "repo")
+    try:
+        os.mkdir(checkout)
+        logger.info(f"Cloning {canonical} ({ref}) for local ingestion")
+        await _git("init", "--quiet", cwd=checkout, timeout=timeout)
+        # The ref comes from the request URL: never let it parse as an option
+        await _git("fetch", "--quiet", "--depth", "1", "--no-tags", "--end-of-options", canonical, ref,
+                   cwd=checkout, timeout=timeout)
+        await _git("checkout", "--quiet", "FETCH_HEAD", cwd=checkout, timeout=timeout)
+        label = canonical.split("://", 1)[-1].split("/", 1)[-1]
+        return await asyncio.to_thread(ingest_directory, Path(checkout), max_chars, label)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, workdir, True)
@@ -5,26 +5,20 @@ from app.services.actions_loader import actions_loader
 
 def get_agent_content(agent_identifier: str) -> str:
     """Get agent content from consolidated agents.yaml"""
-    # Try to find by slug first, then by name for backward compat
-    agent = actions_loader.get_agent_by_slug(agent_identifier)
-    if not agent:
-        # Fallback to finding by name
-        agent = next((a for a in actions_loader.get_agents() if a.name == agent_identifier), None)
+    # Agents are indexed by slug, and the legacy name is always the slug
+    agent = actions_loader.get_agent(agent_identifier)
     
-    if agent and agent.content:
-        return agent.content
+    if agent and agent['content']:
+        return agent['content']
     return ""
 
 def get_rule_content(rule_identifier: str) -> str:
     """Get rule content from consolidated rules.yaml"""
-    # Try to find by slug first, then by name for backward compat
-    rule = actions_loader.get_rule_by_slug(rule_identifier)
-    if not rule:
-        # Fallback to finding by name
-        rule = next((r for r in actions_loader.get_rules() if r.name == rule_identifier), None)
+    # Rules are indexed by slug, and the legacy name is always the slug
+    rule = actions_loader.get_rule(rule_identifier)
     
-    if rule and rule.content:
-        return rule.content
+    if rule and rule['content']:
+        return rule['content']
     return ""
 
 def get_current_mcp_config() -> Dict[str, Any]:
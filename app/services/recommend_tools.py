@@ -4,20 +4,42 @@ Service for recommending tools based on repository context.
 
 import json
 import hashlib
-from typing import Dict, List, Tuple, Optional, Any
+from typing import AsyncIterator, Dict, List, NamedTuple, Tuple, Optional, Any
 from app.services.actions_loader import actions_loader
-import httpx
+from app.services.catalog import Catalog
+from app.services.http_client import http_client
+from app.services.similarity import SimilarityIndex
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
 
-def build_tools_catalog() -> Dict[str, List[Dict[str, Any]]]:
+# Model parameters, part of the recommendation cache key
+LLM_PARAMS = {
+    "model": os.getenv("LLM_MODEL", "gpt-4o-mini"),
+    "temperature": 0.2,  # Low temperature for consistency
+    "max_tokens": 1000
+}
+
+# Catalogs whose prompt text is larger than this are shortlisted per request
+# instead of being inlined in the (cacheable) system prompt
+CATALOG_PROMPT_MAX_CHARS = int(os.getenv("CATALOG_PROMPT_MAX_CHARS", "16000"))
+
+# Candidates per category put in front of the LLM when shortlisting
+SHORTLIST_SIZE = int(os.getenv("RECOMMEND_SHORTLIST_SIZE", "25"))
+
+
+def build_tools_catalog(actions_catalog: Optional[Catalog] = None) -> Dict[str, List[Dict[str, Any]]]:
     """
     Build a minimal catalog of available tools from actions_loader.
     
+    Args:
+        actions_catalog: Catalog snapshot (defaults to the current one)
+        
     Returns:
         Dictionary with three lists: agents, rules, mcps
         Each item has: slug, display_name, tags (optional), type (for rules)
@@ -27,9 +49,10 @@ def build_tools_catalog() -> Dict[str, List[Dict[str, Any]]]:
         "rules": [],
         "mcps": []
     }
+    actions_catalog = actions_catalog or actions_loader.catalog
     
     # Get agents
-    for agent in actions_loader.get_agents():
+    for agent in actions_catalog.get_agents():
         catalog["agents"].append({
             "slug": agent.slug or agent.name,
             "display_name": agent.display_name or agent.name,
@@ -37,7 +60,7 @@ def build_tools_catalog() -> Dict[str, List[Dict[str, Any]]]:
         })
     
     # Get rules
-    for rule in actions_loader.get_rules():
+    for rule in actions_catalog.get_rules():
         catalog["rules"].append({
             "slug": rule.slug or rule.name,
             "display_name": rule.display_name or rule.name,
@@ -46,7 +69,7 @@ def build_tools_catalog() -> Dict[str, List[Dict[str, Any]]]:
         })
     
     # Get MCPs (note: MCP uses 'name' as identifier)
-    for mcp in actions_loader.get_mcps():
+    for mcp in actions_catalog.get_mcps():
         catalog["mcps"].append({
             "slug": mcp.name,  # MCPs use 'name' as slug
             "display_name": mcp.name,
@@ -80,6 +103,66 @@ def get_catalog_version(catalog: Dict[str, List[Dict[str, Any]]]) -> str:
     return hashlib.sha1(slug_string.encode()).hexdigest()[:8]
 
 
+def shortlist_catalog(catalog: Dict[str, List[Dict[str, Any]]], context: str, size: int = SHORTLIST_SIZE,
+                      actions_catalog: Optional[Catalog] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Keep the catalog items most related to the repository context.
+    
+    Items are ranked by TF-IDF cosine similarity to the context (the
+    catalog's similarity index, built at load time), so the prompt stays
+    bounded however large the catalog grows. Used once the catalog no longer
+    fits CATALOG_PROMPT_MAX_CHARS.
+    
+    Args:
+        catalog: The tools catalog
+        context: Repository context
+        size: Items kept per category
+        actions_catalog: Catalog snapshot the tools catalog was built from
+        
+    Returns:
+        Catalog of the same shape, with at most `size` items per category in slug order
+    """
+    actions_catalog = actions_catalog or actions_loader.catalog
+    index = actions_catalog.artifact("similarity_index", SimilarityIndex)
+    scores = index.score_text(context)
+    
+    relevance: Dict[str, float] = {}
+    for position, entry in enumerate(actions_catalog.actions):
+        relevance[entry.id] = max(relevance.get(entry.id, 0.0), float(scores[position]))
+    
+    shortlist = {}
+    for category, items in catalog.items():
+        if len(items) <= size:
+            shortlist[category] = items
+            continue
+        # Stable sort: ties keep slug order
+        ranked = sorted(items, key=lambda item: -relevance.get(item["slug"], 0.0))[:size]
+        shortlist[category] = sorted(ranked, key=lambda item: item["slug"])
+    return shortlist
+
+
+def recommendation_key(context: str, user_prompt: str, catalog_version: str) -> str:
+    """
+    Cache key of a recommendation.
+    
+    Args:
+        context: Repository context sent to the LLM
+        user_prompt: User guidance, compared case- and whitespace-insensitively
+        catalog_version: Content-level version of the actions catalog
+        
+    Returns:
+        SHA-256 over the context hash, prompt, catalog version, LLM_PARAMS and shortlist size
+    """
+    payload = {
+        "context": hashlib.sha256(context.encode()).hexdigest(),
+        "prompt": " ".join(user_prompt.lower().split()),
+        "catalog": catalog_version,
+        "llm": LLM_PARAMS,
+        "shortlist": [CATALOG_PROMPT_MAX_CHARS, SHORTLIST_SIZE]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
 def format_catalog_for_prompt(catalog: Dict[str, List[Dict[str, Any]]]) -> str:
     """
     Format the catalog into a compact text for the LLM prompt.
@@ -113,27 +196,9 @@ def format_catalog_for_prompt(catalog: Dict[str, List[Dict[str, Any]]]) -> str:
     return "\n".join(lines)
 
 
-def call_llm_for_reco(context: str, catalog_text: str, user_prompt: str = "", api_key: Optional[str] = None) -> str:
-    """
-    Call the LLM to get tool recommendations.
-    
-    Args:
-        context: Repository context (summary + tree + content)
-        catalog_text: Formatted catalog of available tools
-        user_prompt: Optional user guidance
-        api_key: Optional OpenAI API key
-        
-    Returns:
-        Raw LLM response string
-    """
-    # Get API key
-    if not api_key:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found")
-    
-    # System prompt
-    system_prompt = """You are "Tool Recommender for Codebases." Your job is to read a repository context and choose a minimal set of helpful tools (rules, agents, MCPs) from the provided catalog.
+# Instructions around the catalog; everything up to the end of the system
+# prompt is identical for every request against one catalog snapshot
+_PROMPT_HEAD = """You are "Tool Recommender for Codebases." Your job is to read a repository context and choose a minimal set of helpful tools (rules, agents, MCPs) from the provided catalog.
 
 Hard requirements:
 - Output strictly valid JSON. No markdown, no commentary.
@@ -148,7 +213,9 @@ Selection guidelines:
 - Base the decision solely on the given repository context and the catalog.
 
 Catalog (one line per item, slug first):
-""" + catalog_text + """
+"""
+
+_PROMPT_TAIL = """
 
 Return JSON with this exact shape:
 - rules: array of slugs
@@ -158,43 +225,189 @@ Return JSON with this exact shape:
 
 You will now receive the repository context (summary, tree, truncated content) and an optional user focus. Choose minimal helpful tools from the catalog and return JSON only."""
 
-    # User message
-    user_message = "Here is the codebase context (truncated). Choose minimal useful tools from the catalog above.\n\n"
+# Stands in for the catalog when it is shortlisted into the user message
+_SHORTLIST_NOTE = "(preselected for this repository, given at the start of the user message)"
+
+
+class RecommendPrompt(NamedTuple):
+    tools: Dict[str, List[Dict[str, Any]]]
+    catalog_version: str
+    system_prompt: str
+    shortlisted: bool  # Catalog too large to inline, shortlist per request
+
+
+def build_recommend_prompt(actions_catalog: Catalog) -> RecommendPrompt:
+    """
+    Precompute the tools catalog and system prompt of a catalog snapshot.
+    
+    Args:
+        actions_catalog: Catalog snapshot
+        
+    Returns:
+        RecommendPrompt, held by the snapshot as the "recommend_prompt" artifact
+    """
+    tools = build_tools_catalog(actions_catalog)
+    catalog_text = format_catalog_for_prompt(tools)
+    shortlisted = len(catalog_text) > CATALOG_PROMPT_MAX_CHARS
+    system_prompt = _PROMPT_HEAD + (_SHORTLIST_NOTE if shortlisted else catalog_text) + _PROMPT_TAIL
+    return RecommendPrompt(tools, get_catalog_version(tools), system_prompt, shortlisted)
+
+
+def build_user_message(context: str, user_prompt: str = "", catalog_text: Optional[str] = None) -> str:
+    """
+    Per-request part of the prompt.
+    
+    Args:
+        context: Repository context (summary + tree + content)
+        user_prompt: Optional user guidance
+        catalog_text: Shortlisted catalog, when the system prompt does not inline it
+        
+    Returns:
+        The user message
+    """
+    user_message = ""
+    if catalog_text:
+        user_message += f"Catalog (one line per item, slug first):\n{catalog_text}\n\n"
+    user_message += "Here is the codebase context (truncated). Choose minimal useful tools from the catalog above.\n\n"
     user_message += context
     if user_prompt:
         user_message += f"\n\nUser focus: {user_prompt}"
+    return user_message
+
+
+def _llm_request(system_prompt: str, user_message: str, api_key: Optional[str] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """URL, headers and body of a recommendation chat completion"""
+    # Get API key
+    if not api_key:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found")
     
-    # Prepare request
+    # Prepare request: the byte-stable system prompt first, so provider-side
+    # prompt caching can reuse it across requests
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message}
     ]
     
-    url = "https://api.openai.com/v1/chat/completions"
+    url = f"{OPENAI_BASE_URL}/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
     
     data = {
-        "model": "gpt-4o-mini",
-        "messages": messages,
-        "temperature": 0.2,  # Low temperature for consistency
-        "max_tokens": 1000
+        **LLM_PARAMS,
+        "messages": messages
     }
+    return url, headers, data
+
+
+async def call_llm_for_reco(system_prompt: str, user_message: str, api_key: Optional[str] = None) -> str:
+    """
+    Call the LLM to get tool recommendations.
+    
+    Args:
+        system_prompt: Static prompt of the catalog snapshot (RecommendPrompt.system_prompt)
+        user_message: Per-request message from build_user_message
+        api_key: Optional OpenAI API key
+        
+    Returns:
+        Raw LLM response string
+    """
+    url, headers, data = _llm_request(system_prompt, user_message, api_key)
+    
+    try:
+        # Pooled connection, retried on rate limits and transient errors
+        response = await http_client.request("POST", url, json=data, headers=headers, timeout=LLM_TIMEOUT)
+        response.raise_for_status()
+        result = response.json()
+        
+        # Extract the content
+        content = result["choices"][0]["message"]["content"]
+        return content
+        
+    except Exception as e:
+        raise Exception(f"LLM call failed: {str(e)}")
+
+
+async def stream_llm_for_reco(system_prompt: str, user_message: str,
+                              api_key: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Call the LLM with streaming and yield the response text as it arrives.
+    
+    Args:
+        system_prompt: Static prompt of the catalog snapshot
+        user_message: Per-request message from build_user_message
+        api_key: Optional OpenAI API key
+        
+    Yields:
+        Content deltas of the completion
+    """
+    url, headers, data = _llm_request(system_prompt, user_message, api_key)
+    data["stream"] = True
     
     try:
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            
-            # Extract the content
-            content = result["choices"][0]["message"]["content"]
-            return content
-            
+        response = await http_client.request("POST", url, json=data, headers=headers,
+                                             timeout=LLM_TIMEOUT, stream=True)
     except Exception as e:
         raise Exception(f"LLM call failed: {str(e)}")
+    try:
+        if response.is_error:
+            await response.aread()
+            raise Exception(f"LLM call failed: {response.status_code} - {response.text}")
+        # OpenAI streams server-sent events, one chunk per "data:" line
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                chunk = json.loads(payload)
+                delta = chunk["choices"][0]["delta"].get("content")
+            except (json.JSONDecodeError, KeyError, IndexError):
+                continue
+            if delta:
+                yield delta
+    finally:
+        await response.aclose()
+
+
+class JsonObjectScanner:
+    """Finds the end of the first top-level JSON object in streamed text"""
+    
+    def __init__(self):
+        self.text = ""
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk; return the complete object text once its closing brace arrives"""
+        offset = len(self.text)
+        self.text += chunk
+        for i in range(offset, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._start >= 0:
+                self._in_string = True
+            elif char == "{":
+                if self._start < 0:
+                    self._start = i
+                self._depth += 1
+            elif char == "}" and self._start >= 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self._start:i + 1]
+        return None
 
 
 def parse_and_validate(llm_raw: str, catalog: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, List[str]], Optional[Dict[str, str]]]:
@@ -276,4 +489,8 @@ def parse_and_validate(llm_raw: str, catalog: Dict[str, List[Dict[str, Any]]]) -
                 elif category == "mcps" and slug in preselect["mcps"]:
                     rationales[key] = str(value)[:200]
     
-    return preselect, rationales
\ No newline at end of file
+    return preselect, rationales
+
+
+# Precompute the prompt with every catalog rather than per request
+actions_loader.register_artifact("recommend_prompt", build_recommend_prompt)
@@ -0,0 +1,115 @@
+"""
+Cache of fully encoded JSON responses for catalog endpoints.
+
+Catalog responses only change when the catalog does, so each distinct query
+is serialized once per catalog version and kept as identity, gzip and brotli
+bytes with a strong ETag per encoding. Requests are answered by picking the
+variant the client accepts, or with 304 when its If-None-Match still matches.
+"""
+
+import gzip
+import hashlib
+from typing import Callable, Hashable, NamedTuple, Optional
+
+import brotli
+from fastapi import Request, Response
+
+from app.services.cache import LRUCache
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Encoding runs on the event loop on every miss. On a 100-action listing
+# brotli 5 and gzip 6 take under a millisecond each; brotli 11 saves another
+# ~15% but takes ~35 ms, more than rendering the response uncached
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+
+class EncodedResponse(NamedTuple):
+    body: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    etag: str  # Quoted strong ETag of the identity body
+
+
+def encode_response(body: bytes) -> EncodedResponse:
+    """Pre-compress a response body and compute its ETag"""
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if len(body) < MIN_COMPRESS_SIZE:
+        return EncodedResponse(body=body, gzip=None, br=None, etag=etag)
+    return EncodedResponse(
+        body=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        br=brotli.compress(body, quality=BROTLI_QUALITY),
+        etag=etag
+    )
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Content codings the client accepts (q=0 means refused)"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                pass
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def _variant_etag(etag: str, coding: Optional[str]) -> str:
+    # Strong validators must differ between content codings
+    return etag if coding is None else f'{etag[:-1]}-{coding}"'
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 512):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._version: Optional[str] = None
+
+    def get_or_encode(self, version: str, key: Hashable, render: Callable[[], bytes]) -> EncodedResponse:
+        """Return the encoded response for key, rendering it on a miss.
+
+        The whole cache is dropped as soon as a new catalog version is seen.
+        """
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+        return self._cache.get_or_set(key, lambda: encode_response(render()))
+
+    def respond(self, request: Request, encoded: EncodedResponse,
+                media_type: str = "application/json") -> Response:
+        """Build the response for this client, honoring Accept-Encoding and If-None-Match"""
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        coding, body = None, encoded.body
+        if encoded.br is not None and "br" in accepted:
+            coding, body = "br", encoded.br
+        elif encoded.gzip is not None and "gzip" in accepted:
+            coding, body = "gzip", encoded.gzip
+
+        headers = {
+            "ETag": _variant_etag(encoded.etag, coding),
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-cache"
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(',')}
+            known = {_variant_etag(encoded.etag, c) for c in (None, "gzip", "br")}
+            if "*" in candidates or candidates & known:
+                return Response(status_code=304, headers=headers)
+
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def stats(self):
+        return {"catalog_version": self._version, **self._cache.stats()}
@@ -0,0 +1,204 @@
+"""
+Inverted index over the catalog for SearchService.
+
+Built once per catalog (see Catalog.artifact), it holds:
+
+- a tokenized inverted index with BM25 impacts precomputed per posting, over
+  name, display_name, tags, author, description, MCP config and content,
+  each field weighted (BM25F-style) before saturation;
+- a character-trigram index over the term vocabulary, so that a misspelled
+  or partial query term is expanded to the closest known terms.
+
+A query is answered by summing the postings of its (expanded) terms, which
+only touches documents that share a term with it. The best candidates are
+picked with a heap and handed back for fuzzy re-scoring.
+"""
+
+import heapq
+import math
+import re
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.actions import ActionType
+from app.services.catalog import Catalog
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Field weights applied to term frequencies before saturation
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "display_name": 3.0,
+    "tags": 2.0,
+    "author": 1.5,
+    "description": 1.5,
+    "config": 0.5,
+    "content": 1.0,
+}
+
+# Minimum Dice similarity between trigram sets for a typo expansion
+MIN_TRIGRAM_SIMILARITY = 0.45
+# Weight of a prefix match relative to an exact term match
+PREFIX_WEIGHT = 0.8
+# Shortest word considered for prefix matching
+MIN_PREFIX_LENGTH = 3
+# Known terms a single query term may expand to
+MAX_EXPANSIONS = 10
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens (slugs split on '-' and '_')"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(term: str) -> Set[str]:
+    """Character trigrams of a term, padded so short terms still have some"""
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def entry_fields(catalog: Catalog, entry) -> Dict[str, str]:
+    """Searchable text of an entry, by field"""
+    return {
+        "name": entry.id,
+        "display_name": entry.display_name or "",
+        "tags": " ".join(entry.tags or ()),
+        "author": entry.author or "",
+        "description": entry.description or "",
+        "config": str(entry.config) if entry.config else "",
+        "content": catalog.get_content(entry) or "",
+    }
+
+
+class SearchIndex:
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.size = len(catalog.actions)
+        self._types: List[ActionType] = [entry.action_type for entry in catalog.actions]
+        # term -> (positions, BM25 impacts), positions ascending
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # trigram -> terms of the vocabulary containing it
+        self._trigrams: Dict[str, List[str]] = defaultdict(list)
+        self._gram_counts: Dict[str, int] = {}
+        self._build()
+
+    def _build(self):
+        frequencies: List[Counter] = []
+        lengths = []
+        for entry in self.catalog.actions:
+            weighted = Counter()
+            for field, text in entry_fields(self.catalog, entry).items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    weighted[token] += weight
+            frequencies.append(weighted)
+            lengths.append(sum(weighted.values()))
+
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        document_frequency = Counter()
+        for weighted in frequencies:
+            document_frequency.update(weighted.keys())
+
+        postings: Dict[str, Tuple[array, array]] = {}
+        for position, weighted in enumerate(frequencies):
+            norm = K1 * (1 - B + B * lengths[position] / average_length) if average_length else K1
+            for term, tf in weighted.items():
+                plist = postings.get(term)
+                if plist is None:
+                    plist = postings[term] = (array('i'), array('f'))
+                plist[0].append(position)
+                plist[1].append(tf * (K1 + 1) / (tf + norm))
+
+        # Fold the idf into the stored impacts so scoring is a plain sum
+        for term, (_, impacts) in postings.items():
+            df = document_frequency[term]
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            for i in range(len(impacts)):
+                impacts[i] *= idf
+            grams = trigrams(term)
+            self._gram_counts[term] = len(grams)
+            for gram in grams:
+                self._trigrams[gram].append(term)
+
+        self._postings = postings
+
+    def expand_term(self, term: str) -> List[Tuple[str, float]]:
+        """Known terms matching a query term, with a similarity weight.
+
+        A term always matches itself. It is also expanded to the closest
+        known terms by trigram overlap, which covers typos, and by prefix
+        containment in either direction, which covers partial words
+        ("pyth" -> "python") and short tags inside longer words.
+        """
+        grams = trigrams(term)
+        shared = Counter()
+        shared_open = Counter()
+        for gram in grams:
+            matches = self._trigrams.get(gram, ())
+            shared.update(matches)
+            if not gram.endswith('$'):
+                shared_open.update(matches)
+
+        scored = {}
+        open_count = len(grams) - 1
+        for candidate, count in shared.items():
+            if candidate == term:
+                continue
+            similarity = 2 * count / (len(grams) + self._gram_counts[candidate])
+            if min(len(term), len(candidate)) >= MIN_PREFIX_LENGTH:
+                containment = shared_open[candidate] / min(open_count, self._gram_counts[candidate] - 1)
+                similarity = max(similarity, PREFIX_WEIGHT * containment)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored[candidate] = similarity
+
+        expansions = heapq.nlargest(MAX_EXPANSIONS, scored.items(), key=lambda item: item[1])
+        if term in self._postings:
+            expansions.insert(0, (term, 1.0))
+        return expansions
+
+    def terms_containing(self, fragment: str) -> List[str]:
+        """Vocabulary terms that contain fragment (at least 3 characters long)"""
+        grams = [fragment[i:i + 3] for i in range(len(fragment) - 2)]
+        lists = sorted((self._trigrams.get(gram, ()) for gram in grams), key=len)
+        if not lists or not lists[0]:
+            return []
+        terms = set(lists[0])
+        for other in lists[1:]:
+            terms.intersection_update(other)
+        return [term for term in terms if fragment in term]
+
+    def positions_containing(self, fragment: str) -> Set[int]:
+        """Catalog positions with a term that contains fragment"""
+        positions = set()
+        for term in self.terms_containing(fragment):
+            positions.update(self._postings[term][0])
+        return positions
+
+    def candidates(self, query: str, action_types: Optional[Iterable[ActionType]] = None,
+                   k: int = 100) -> List[Tuple[int, float]]:
+        """Top-k catalog positions for a query, scored by BM25.
+
+        Args:
+            query: Free-text query
+            action_types: Restrict to these action types
+            k: Size of the shortlist
+
+        Returns:
+            (position, score) pairs, best first
+        """
+        allowed = set(action_types) if action_types else None
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            for term, similarity in self.expand_term(token):
+                positions, impacts = self._postings[term]
+                for position, impact in zip(positions, impacts):
+                    scores[position] += similarity * impact
+        if allowed is not None:
+            types = self._types
+            scores = {p: s for p, s in scores.items() if types[p] in allowed}
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
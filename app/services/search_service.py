@@ -1,141 +1,135 @@
-from typing import List, Optional, Dict, Any
-from fuzzywuzzy import fuzz
-from app.models.actions import Agent, Rule, MCP
+from typing import List, Optional, Dict, Any, Tuple
 from app.services.actions_loader import actions_loader
+from app.services.cache import LRUCache
+from app.services.catalog import Catalog
+from app.services.fuzzy_scoring import SEARCH_GROUPS, build_scorers
+from app.services.search_index import SearchIndex
+from app.services.wildcard_search import WildcardIndex
+import heapq
+import os
 import re
-import fnmatch
+
+# Minimum number of index candidates re-scored with fuzzy matching
+SHORTLIST_SIZE = 50
+
+# Ranked results kept per query, pages are sliced from them
+MAX_RESULTS = 100
+
+# Key of the item in a hit, per search group
+RESULT_KEYS = {"agents": "agent", "rules": "rule", "mcps": "mcp"}
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: scoring is case-insensitive and ignores extra spaces"""
+    return " ".join(query.lower().split())
 
 class SearchService:
     def __init__(self):
         self.actions_loader = actions_loader
+        # Build the index with every catalog rather than on the first query
+        self.actions_loader.register_artifact("search_index", SearchIndex)
+        self.actions_loader.register_artifact("fuzzy_scorers", build_scorers)
+        self.actions_loader.register_artifact("wildcard_index", WildcardIndex)
+        # Ranked results by (query, groups, limit, catalog version)
+        self.cache = LRUCache(
+            maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "2048")),
+            ttl=float(os.getenv("SEARCH_CACHE_TTL", "600"))
+        )
     
     def _is_wildcard_query(self, query: str) -> bool:
         """Check if query contains wildcard characters"""
         return '*' in query or '?' in query
     
-    def _wildcard_match(self, pattern: str, text: str) -> bool:
-        """Check if text matches wildcard pattern"""
-        return fnmatch.fnmatch(text.lower(), pattern.lower())
-    
-    def _calculate_relevance(self, query: str, text: str) -> int:
-        """Calculate relevance score for fuzzy matching with wildcard support"""
-        if not text:
-            return 0
-        query_lower = query.lower()
-        text_lower = text.lower()
-        
-        # Handle wildcard queries
+    def _search(self, catalog: Catalog, query: str, limit: int, group: str, key: str, view_of,
+                drop_field: str) -> List[Dict[str, Any]]:
+        """Rank one search group of a catalog snapshot.
+
+        Plain queries take a BM25 shortlist from the inverted index and score
+        it in batch; wildcard queries go through the wildcard query planner.
+        Indexes, positions and items all come from the same snapshot.
+        """
         if self._is_wildcard_query(query):
-            if self._wildcard_match(query, text):
-                return 95  # High score for wildcard matches
-            else:
-                return 0
-        
-        # Exact match gets highest score
-        if query_lower == text_lower:
-            return 100
-        
-        # Substring match gets high score
-        if query_lower in text_lower:
-            return 90
-        
-        # Use fuzzy matching for partial matches
-        return fuzz.partial_ratio(query_lower, text_lower)
-    
-    def search_agents(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search for agents by name, display_name, or content"""
-        agents = self.actions_loader.get_agents()
+            matcher = catalog.artifact("wildcard_index", WildcardIndex)
+            scored = ((view_of(catalog.actions[position].id), relevance)
+                      for position, relevance in matcher.search(query, group))
+        else:
+            index = catalog.artifact("search_index", SearchIndex)
+            scorer = catalog.artifact("fuzzy_scorers", build_scorers)[group]
+            shortlist = index.candidates(query, SEARCH_GROUPS[group].action_types,
+                                         k=max(SHORTLIST_SIZE, limit * 5))
+            positions, relevance = scorer.score(query, [position for position, _ in shortlist])
+            scored = ((view_of(catalog.actions[position].id), float(value))
+                      for position, value in zip(positions.tolist(), relevance.tolist()))
+
         results = []
-        
-        for agent in agents:
-            # Calculate relevance scores for different fields
-            name_score = self._calculate_relevance(query, agent.name)
-            display_score = self._calculate_relevance(query, agent.display_name or "")
-            content_score = self._calculate_relevance(query, agent.content or "") * 0.5  # Lower weight for content
-            
-            max_score = max(name_score, display_score, content_score)
-            
+        for item, max_score in scored:
             if max_score > 30:  # Threshold for relevance
-                agent_data = agent.dict()
-                # Remove content from search results
-                agent_data.pop("content", None)
-                results.append({
-                    "agent": agent_data,
-                    "relevance": max_score
-                })
-        
-        # Sort by relevance and limit results
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        return results[:limit]
-    
-    def search_rules(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+                data = item.dict()
+                # Remove bulky fields from search results
+                data.pop(drop_field, None)
+                results.append({key: data, "relevance": max_score})
+
+        # Keep only the best results, without sorting all of them
+        return heapq.nlargest(limit, results, key=lambda x: x["relevance"])
+
+    def search_agents(self, query: str, limit: int = 10,
+                      catalog: Optional[Catalog] = None) -> List[Dict[str, Any]]:
+        """Search for agents by name, display_name, or content"""
+        catalog = catalog or self.actions_loader.catalog
+        return self._search(catalog, query, limit, "agents", "agent", catalog.get_agent, "content")
+
+    def search_rules(self, query: str, limit: int = 10,
+                     catalog: Optional[Catalog] = None) -> List[Dict[str, Any]]:
         """Search for rules by name, display_name, content, tags, or author"""
-        rules = self.actions_loader.get_rules()
-        results = []
-        
-        for rule in rules:
-            # Calculate relevance scores for different fields
-            name_score = self._calculate_relevance(query, rule.name)
-            display_score = self._calculate_relevance(query, rule.display_name or "")
-            content_score = self._calculate_relevance(query, rule.content or "") * 0.5
-            author_score = self._calculate_relevance(query, rule.author or "") * 0.7
-            
-            # Check tags
-            tag_score = 0
-            if rule.tags:
-                for tag in rule.tags:
-                    tag_score = max(tag_score, self._calculate_relevance(query, tag))
-            
-            max_score = max(name_score, display_score, content_score, author_score, tag_score)
-            
-            if max_score > 30:  # Threshold for relevance
-                rule_data = rule.dict()
-                # Remove content from search results
-                rule_data.pop("content", None)
-                results.append({
-                    "rule": rule_data,
-                    "relevance": max_score
-                })
-        
-        # Sort by relevance and limit results
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        return results[:limit]
-    
-    def search_mcps(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        catalog = catalog or self.actions_loader.catalog
+        return self._search(catalog, query, limit, "rules", "rule", catalog.get_rule, "content")
+
+    def search_mcps(self, query: str, limit: int = 10,
+                    catalog: Optional[Catalog] = None) -> List[Dict[str, Any]]:
         """Search for MCPs by name or config content"""
-        mcps = self.actions_loader.get_mcps()
-        results = []
-        
-        for mcp in mcps:
-            # Calculate relevance scores
-            name_score = self._calculate_relevance(query, mcp.name)
-            
-            # Search in config (convert to string for searching)
-            config_str = str(mcp.config)
-            config_score = self._calculate_relevance(query, config_str) * 0.5
-            
-            max_score = max(name_score, config_score)
-            
-            if max_score > 30:  # Threshold for relevance
-                mcp_data = mcp.dict()
-                # Remove config from search results
-                mcp_data.pop("config", None)
-                results.append({
-                    "mcp": mcp_data,
-                    "relevance": max_score
-                })
-        
-        # Sort by relevance and limit results
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        return results[:limit]
+        catalog = catalog or self.actions_loader.catalog
+        return self._search(catalog, query, limit, "mcps", "mcp", catalog.get_mcp, "config")
     
     def search_all(self, query: str, limit: int = 10) -> Dict[str, Any]:
         """Search across all types (agents, rules, MCPs)"""
+        catalog = self.actions_loader.catalog
         return {
-            "agents": self.search_agents(query, limit),
-            "rules": self.search_rules(query, limit),
-            "mcps": self.search_mcps(query, limit)
+            "agents": self.search_agents(query, limit, catalog),
+            "rules": self.search_rules(query, limit, catalog),
+            "mcps": self.search_mcps(query, limit, catalog)
         }
 
+    def search(self, query: str, groups: Optional[List[str]] = None,
+               limit: int = MAX_RESULTS) -> List[Dict[str, Any]]:
+        """Ranked hits across search groups, cached per catalog version.
+
+        Args:
+            query: Search query, normalized before scoring and caching
+            groups: Search groups to include (agents, rules, mcps), all if empty
+            limit: Maximum number of hits
+
+        Returns:
+            Hits as {"type", "id", "relevance", "item"} dicts, best first.
+            The list is shared between callers and must not be modified.
+        """
+        query = normalize_query(query)
+        groups = tuple(group for group in RESULT_KEYS if not groups or group in groups)
+        # One snapshot for the key and the ranking, even if a reload swaps it meanwhile
+        catalog = self.actions_loader.catalog
+        key = (query, groups, limit, catalog.version)
+        return self.cache.get_or_set(key, lambda: self._rank(catalog, query, groups, limit))
+
+    def _rank(self, catalog: Catalog, query: str, groups: Tuple[str, ...],
+              limit: int) -> List[Dict[str, Any]]:
+        searches = {"agents": self.search_agents, "rules": self.search_rules, "mcps": self.search_mcps}
+        hits = []
+        for group in groups:
+            result_key = RESULT_KEYS[group]
+            for result in searches[group](query, limit, catalog):
+                item = result[result_key]
+                hits.append({"type": result_key, "id": item["name"],
+                             "relevance": result["relevance"], "item": item})
+        return heapq.nlargest(limit, hits, key=lambda hit: hit["relevance"])
+
 # Create singleton instance
 search_service = SearchService()
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Offline "similar actions" engine.
+
+Every action gets a sparse TF-IDF vector over its content, description,
+display name and tags (tags and names weighted up), built once per catalog
+with SciPy. Rows are L2-normalized at build time, so the neighbours of an
+action are one sparse matrix-vector product (cosine similarity) followed by
+a partial sort for the top-k. No embedding service involved.
+
+The same vectors rank the catalog against free text, such as a repository
+context when shortlisting candidates for the recommender.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.models.actions import ActionType
+from app.services.catalog import Catalog
+from app.services.search_index import tokenize
+
+# Term weights per field, applied before sublinear tf scaling
+FIELD_WEIGHTS = {
+    "tags": 3.0,
+    "display_name": 2.0,
+    "description": 1.5,
+    "content": 1.0,
+}
+
+# Terms in more than this share of the actions carry no signal
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+
+class SimilarityIndex:
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._types = np.array([entry.action_type.value for entry in catalog.actions])
+
+        frequencies = []
+        for entry in catalog.actions:
+            counts = Counter()
+            content = catalog.get_content(entry) or ""
+            if entry.children:
+                # Rulesets and packs are described by what they expand to
+                content = " ".join([content] + [
+                    " ".join([child.display_name or child.id, " ".join(child.tags or ()),
+                              catalog.get_content(child) or ""])
+                    for child in catalog.expand_selection([entry.id]) if child.id != entry.id
+                ])
+            fields = {
+                "tags": " ".join(entry.tags or ()),
+                "display_name": entry.display_name or entry.id,
+                "description": entry.description or "",
+                "content": content,
+            }
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    counts[token] += weight
+            frequencies.append(counts)
+
+        size = len(frequencies)
+        document_frequency = Counter(term for counts in frequencies for term in counts)
+        max_df = max(1, int(MAX_DOCUMENT_FREQUENCY * size))
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: List[float] = []
+        for term, df in document_frequency.items():
+            if df <= max_df:
+                self.vocabulary[term] = len(self.vocabulary)
+                self.idf.append(math.log((1 + size) / (1 + df)) + 1)
+
+        rows, cols, values = [], [], []
+        for row, counts in enumerate(frequencies):
+            for col, value in self._weigh(counts):
+                rows.append(row)
+                cols.append(col)
+                values.append(value)
+
+        matrix = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, cols)),
+            shape=(size, len(self.vocabulary))
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.matrix = sparse.diags(1 / norms).dot(matrix).tocsr()
+        self.vocabulary_size = len(self.vocabulary)
+
+    def _weigh(self, counts: Counter) -> List[Tuple[int, float]]:
+        """(column, sublinear tf-idf) of the in-vocabulary terms of a document"""
+        weighted = []
+        for term, tf in counts.items():
+            col = self.vocabulary.get(term)
+            if col is not None:
+                weighted.append((col, (1 + math.log(tf)) * self.idf[col]))
+        return weighted
+
+    def similar(self, position: int, k: int = 10,
+                action_types: Optional[Sequence[ActionType]] = None) -> List[Tuple[int, float]]:
+        """Top-k (position, cosine similarity) neighbours of the action at position"""
+        scores = (self.matrix @ self.matrix[position].T).toarray().ravel()
+        scores[position] = 0
+        if action_types:
+            scores[~np.isin(self._types, [t.value for t in action_types])] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(p), float(scores[p])) for p in ranked]
+
+    def score_text(self, text: str) -> np.ndarray:
+        """Cosine similarity of every action to a free-text document"""
+        weighted = self._weigh(Counter(tokenize(text)))
+        if not weighted:
+            return np.zeros(self.matrix.shape[0], dtype=np.float32)
+        cols, values = zip(*weighted)
+        query = np.zeros(self.vocabulary_size, dtype=np.float32)
+        query[list(cols)] = values
+        query /= np.linalg.norm(query)
+        return self.matrix @ query
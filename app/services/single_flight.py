@@ -0,0 +1,183 @@
+"""
+Single-flight coalescing of duplicate in-flight work.
+
+When a repository link is shared, bursts of identical /api/recommend calls
+arrive within seconds. A SingleFlight runs one call per key at a time and
+hands every concurrent caller the same result (or the same exception); the
+next call after it finishes starts afresh, so results are never cached here.
+
+The shared call runs as its own task: a caller that is cancelled (its client
+disconnected) stops waiting without cancelling the work for the others, and
+the work is only cancelled once no caller is waiting any more. A caller
+arriving after that starts a new call.
+
+Across worker processes an optional SQLite lease (SINGLE_FLIGHT_LEASE_PATH)
+makes workers take turns on a key. The work passed in is expected to check
+its persistent cache first, so a worker that waited on another's lease finds
+the result there instead of recomputing it.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# How often a worker waiting on another worker's lease checks again
+LEASE_POLL_INTERVAL = 0.25
+
+
+class Lease:
+    """Cross-process mutual exclusion per key, backed by one SQLite file.
+
+    A lease expires after `ttl` seconds, so a worker that dies while holding
+    one only delays the others. Blocking; called from worker threads.
+    """
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def acquire(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, self.owner, now + self.ttl)
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def release(self, key: str):
+        with self._lock:
+            self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[bool]:
+        """Wait for the lease on key (at most ttl seconds) and hold it.
+
+        Yields:
+            Whether the lease was acquired; on errors or timeout the work
+            goes ahead without it
+        """
+        acquired = False
+        deadline = time.monotonic() + self.ttl
+        try:
+            while True:
+                acquired = await asyncio.to_thread(self.acquire, key)
+                if acquired or time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(LEASE_POLL_INTERVAL)
+        except sqlite3.Error as e:
+            logger.warning(f"Lease {key} unavailable, going ahead without it: {e}")
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    await asyncio.to_thread(self.release, key)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to release lease {key}: {e}")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str, lease: Optional[Lease] = None):
+        self.name = name
+        self.lease = lease
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn for key, or join the call already running for it.
+
+        Raises:
+            Whatever fn raised, in every caller that shared the call
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.cancelled():
+            call = _Call(asyncio.ensure_future(self._run(key, fn)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"{self.name}: joined in-flight call for {key}")
+
+        call.waiters += 1
+        try:
+            # Shielded: one caller going away must not cancel the others' work
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.info(f"{self.name}: no callers left, cancelling {key}")
+                call.task.cancel()
+                # A caller arriving before the task winds down starts afresh
+                # rather than sharing a cancellation it did not ask for
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        if self.lease is None:
+            return await fn()
+        async with self.lease.hold(f"{self.name}:{key}"):
+            return await fn()
+
+    def _finished(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the outcome retrieved even if every caller left first
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+
+@lru_cache(maxsize=None)
+def shared_lease() -> Optional[Lease]:
+    """The cross-worker lease configured by SINGLE_FLIGHT_LEASE_PATH, if any"""
+    path = os.getenv("SINGLE_FLIGHT_LEASE_PATH", "")
+    if not path:
+        return None
+    return Lease(Path(path), float(os.getenv("SINGLE_FLIGHT_LEASE_TTL", "300")))
@@ -2,78 +2,121 @@
 Functions for ingesting repositories and sending context to OpenAI API.
 """
 
+import asyncio
 import httpx
-from typing import Optional, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, Optional
 from dotenv import load_dotenv
 import os
 from loguru import logger
+from app.services.http_client import http_client
+from app.services.context_builder import CHARS_PER_TOKEN, build_context
+from app.services.ingest_cache import ingest_cache
+from app.services.local_ingest import ingest_clone, ingest_directory, local_path
 
 # Load environment variables from .env file
 load_dotenv()
 
+GITINGEST_API_URL = os.getenv("GITINGEST_API_URL", "https://gitingest.com/api/ingest")
+INGEST_TIMEOUT = float(os.getenv("INGEST_TIMEOUT", "120"))
+# "remote" (gitingest.com) or "local" (shallow clone ingested in-process)
+INGEST_BACKEND = os.getenv("INGEST_BACKEND", "remote")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
 
-async def use_gitingest(url: str, context_size: int = 50000) -> str:
+# Runs a unit of expensive work, e.g. on a bounded job queue
+Schedule = Callable[[Callable[[], Awaitable[str]]], Awaitable[str]]
+
+
+async def fetch_gitingest(url: str) -> str:
     """
-    Ingest a repository using gitingest.com API and trim to specified token size.
+    Ingest a repository using gitingest.com API.
     
     Args:
         url: Repository URL to ingest
-        context_size: Maximum context size in tokens (default ~50k tokens)
     
     Returns:
-        String containing the repository context, trimmed to specified size
+        String containing the full repository context
     """
     logger.info(f"Ingesting repository from {url}")
-    # Query gitingest.com API instead of local package
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            # Call gitingest.com API
-            response = await client.post(
-                "https://gitingest.com/api/ingest",
-                json={
-                    "input_text": url,
-                    "max_file_size": 102400,
-                    "pattern_type": "exclude",
-                    "pattern": "",
-                    "token": ""
-                },
-                headers={
-                    "Content-Type": "application/json"
-                }
-            )
-            response.raise_for_status()
-            
-            # Parse response - assuming it returns the full context
-            data = response.json()
-            full_context = data.get("content", "")
-            
-            # If the API returns structured data, combine it
-            if isinstance(data, dict) and "summary" in data:
-                summary = data.get("summary", "")
-                tree = data.get("tree", "")
-                content = data.get("content", "")
-                full_context = f"{summary}\n\n{tree}\n\n{content}"
-            
-        except httpx.HTTPError as e:
-            logger.error(f"Failed to ingest repository from gitingest.com: {str(e)}")
-            raise Exception(f"Failed to ingest repository from gitingest.com: {str(e)}")
-    
-    # Approximate token count (roughly 4 chars per token)
-    # Trim to specified context size
-    max_chars = context_size * 4
-    original_length = len(full_context)
-    if len(full_context) > max_chars:
-        full_context = full_context[:max_chars]
-        # Add ellipsis to indicate truncation
-        full_context += "\n\n... (context truncated)"
-        logger.info(f"Context truncated from {original_length} to {len(full_context)} characters")
-    else:
-        logger.info(f"Repository context ingested: {len(full_context)} characters")
+    # Query gitingest.com API instead of local package, over the shared pool
+    try:
+        # Call gitingest.com API
+        response = await http_client.request(
+            "POST",
+            GITINGEST_API_URL,
+            json={
+                "input_text": url,
+                "max_file_size": 102400,
+                "pattern_type": "exclude",
+                "pattern": "",
+                "token": ""
+            },
+            headers={
+                "Content-Type": "application/json"
+            },
+            timeout=INGEST_TIMEOUT
+        )
+        response.raise_for_status()
+        
+        # Parse response - assuming it returns the full context
+        data = response.json()
+        full_context = data.get("content", "")
+        
+        # If the API returns structured data, combine it
+        if isinstance(data, dict) and "summary" in data:
+            summary = data.get("summary", "")
+            tree = data.get("tree", "")
+            content = data.get("content", "")
+            full_context = f"{summary}\n\n{tree}\n\n{content}"
+        
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to ingest repository from gitingest.com: {str(e)}")
+        raise Exception(f"Failed to ingest repository from gitingest.com: {str(e)}")
     
     return full_context
 
 
-def smart_ingest(
+async def use_gitingest(url: str, context_size: int = 50000, schedule: Optional[Schedule] = None) -> str:
+    """
+    Ingest a repository (or reuse a cached ingest) and pack it into a token budget.
+    
+    Args:
+        url: Repository URL to ingest
+        context_size: Maximum context size in tokens (default ~50k tokens)
+        schedule: Runs the ingest itself; only called on a cache miss, by the
+            one caller that performs it (default: run it directly)
+    
+    Returns:
+        String containing the most useful parts of the repository context
+    """
+    # Local ingestion stops reading at a character budget; leave the
+    # context builder room to drop duplicates and low-value files
+    max_chars = context_size * CHARS_PER_TOKEN * 3 // 2
+    
+    def scheduled(ingest: Callable[[str], Awaitable[str]]) -> Callable[[str], Awaitable[str]]:
+        if schedule is None:
+            return ingest
+        return lambda repo_url: schedule(lambda: ingest(repo_url))
+    
+    directory = local_path(url)
+    if directory is not None:
+        # Local checkouts are cheap to read and may change at any time
+        full_context = await asyncio.to_thread(ingest_directory, directory, max_chars)
+    elif INGEST_BACKEND == "local":
+        # Reads only what fits the budget, so the budget is part of the key
+        full_context = await ingest_cache.get_or_ingest(
+            url, scheduled(lambda repo_url: ingest_clone(repo_url, max_chars)), variant=f"local-{max_chars}"
+        )
+    else:
+        full_context = await ingest_cache.get_or_ingest(url, scheduled(fetch_gitingest))
+    
+    # Manifests, READMEs, CI and entry points first, counted in real tokens
+    context = await asyncio.to_thread(build_context, full_context, context_size)
+    logger.info(f"Repository context: {len(full_context)} characters ingested, {len(context)} kept")
+    return context
+
+
+async def smart_ingest(
     context: str, 
     user_prompt: str = "Analyze this repository and provide insights",
     api_key: Optional[str] = None
@@ -123,7 +166,7 @@ Be specific and provide actionable recommendations."""
     ]
     
     # OpenAI API endpoint
-    url = "https://api.openai.com/v1/chat/completions"
+    url = f"{OPENAI_BASE_URL}/chat/completions"
     
     # Headers for the API request
     headers = {
@@ -140,24 +183,23 @@ Be specific and provide actionable recommendations."""
     }
     
     try:
-        # Make the API call
-        with httpx.Client(timeout=60.0) as client:
-            response = client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Extract the response
-            choice = result.get("choices", [{}])[0]
-            message = choice.get("message", {})
-            
-            return {
-                "success": True,
-                "response": message.get("content", ""),
-                "model": result.get("model"),
-                "usage": result.get("usage", {}),
-                "finish_reason": choice.get("finish_reason")
-            }
+        # Make the API call over the shared pool
+        response = await http_client.request("POST", url, json=data, headers=headers, timeout=LLM_TIMEOUT)
+        response.raise_for_status()
+        
+        result = response.json()
+        
+        # Extract the response
+        choice = result.get("choices", [{}])[0]
+        message = choice.get("message", {})
+        
+        return {
+            "success": True,
+            "response": message.get("content", ""),
+            "model": result.get("model"),
+            "usage": result.get("usage", {}),
+            "finish_reason": choice.get("finish_reason")
+        }
             
     except httpx.HTTPStatusError as e:
         error_detail = e.response.text if e.response else str(e)
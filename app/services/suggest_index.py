@@ -0,0 +1,147 @@
+"""
+Typeahead completions for the select page filter box.
+
+Completions are action slugs and display names, tags and rule namespaces.
+Each one is indexed under its lower-cased text and under every later word
+start, so "qual" completes "Code Quality". Completions are weighted by
+popularity within the catalog: how many rulesets and packs include an
+action, how many actions carry a tag, how many rules live in a namespace.
+
+The index is a trie over the sorted keys. Dense nodes (prefixes shared by
+more than SCAN_LIMIT keys) store their top-k completions precomputed; below
+that a prefix is resolved by bisecting the sorted keys and ranking the few
+keys in range, so the structure stays small however large the catalog is.
+Built once per catalog, it is rebuilt whenever the catalog is.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.models.actions import ActionType
+from app.services.catalog import Catalog
+
+# Completions precomputed per dense trie node
+TOP_K = 20
+
+# Prefixes matching at most this many keys are ranked on the fly
+SCAN_LIMIT = 64
+
+_WORD_START = re.compile(r"(?<=[\s\-_/.])\w")
+_SPACES = re.compile(r"\s+")
+
+
+class Suggestion(NamedTuple):
+    text: str  # Display name for actions
+    kind: str  # action, tag or namespace
+    weight: int
+    id: Optional[str] = None
+    action_type: Optional[ActionType] = None
+
+
+def _word_suffixes(text: str) -> List[str]:
+    """The text from its start and from every later word start"""
+    lowered = text.lower()
+    return [lowered] + [lowered[m.start():] for m in _WORD_START.finditer(lowered)]
+
+
+class SuggestIndex:
+    def __init__(self, catalog: Catalog):
+        self.suggestions: List[Suggestion] = self._collect(catalog)
+
+        keys = []
+        for number, suggestion in enumerate(self.suggestions):
+            # Actions complete from their slug as well as their display name
+            texts = [suggestion.text] if suggestion.id is None else [suggestion.id, suggestion.text]
+            for key in dict.fromkeys(suffix for text in texts for suffix in _word_suffixes(text)):
+                keys.append((key, number))
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._owners = [number for _, number in keys]
+        self._rank = [self._sort_key(s) for s in self.suggestions]
+
+        # Trie of the dense nodes: prefix -> precomputed top-k
+        self._top: Dict[str, Tuple[int, ...]] = {}
+        self._build_dense_nodes(0, len(self._keys), 0)
+
+    @staticmethod
+    def _collect(catalog: Catalog) -> List[Suggestion]:
+        """Completions with their popularity weight"""
+        references = Counter()
+        for entry in catalog.actions:
+            references.update(set(entry.children or ()))
+        tags = Counter(tag for entry in catalog.actions for tag in set(entry.tags or ()))
+        namespaces = Counter(entry.namespace for entry in catalog.actions if entry.namespace)
+
+        suggestions = []
+        seen = set()
+        for entry in catalog.actions:
+            if entry.id in seen:
+                continue
+            seen.add(entry.id)
+            suggestions.append(Suggestion(entry.display_name or entry.id, "action", 1 + references[entry.id],
+                                          entry.id, entry.action_type))
+        suggestions.extend(Suggestion(tag, "tag", count) for tag, count in tags.items())
+        suggestions.extend(Suggestion(namespace, "namespace", count) for namespace, count in namespaces.items())
+        return suggestions
+
+    @staticmethod
+    def _sort_key(suggestion: Suggestion) -> Tuple:
+        # Most popular first, then the shortest (closest) completion
+        return (-suggestion.weight, len(suggestion.text), suggestion.text.lower())
+
+    def _rank_range(self, lo: int, hi: int, k: int) -> List[int]:
+        """Best k distinct completions among keys[lo:hi]"""
+        numbers = set(self._owners[lo:hi])
+        return heapq.nsmallest(k, numbers, key=self._rank.__getitem__)
+
+    def _build_dense_nodes(self, lo: int, hi: int, depth: int) -> Tuple[int, ...]:
+        """Precompute the top-k of the dense nodes under keys[lo:hi], bottom-up.
+
+        Keys in [lo, hi) share their first `depth` characters; children are
+        the runs of keys sharing one more character. A node's top-k is the
+        top-k of its children's, so every key is ranked only once, at the
+        sparse node it falls under.
+
+        Returns:
+            The top-k of the range itself
+        """
+        keys = self._keys
+        candidates = set()
+        start = lo
+        # Keys equal to the shared prefix have no child
+        while start < hi and len(keys[start]) <= depth:
+            candidates.add(self._owners[start])
+            start += 1
+        while start < hi:
+            char = keys[start][depth]
+            end = start
+            while end < hi and len(keys[end]) > depth and keys[end][depth] == char:
+                end += 1
+            if end - start > SCAN_LIMIT:
+                top = self._build_dense_nodes(start, end, depth + 1)
+                self._top[keys[start][:depth + 1]] = top
+                candidates.update(top)
+            else:
+                candidates.update(self._owners[start:end])
+            start = end
+        return tuple(heapq.nsmallest(TOP_K, candidates, key=self._rank.__getitem__))
+
+    def suggest(self, prefix: str, k: int = 8) -> List[Suggestion]:
+        """Top-k completions of a prefix, best first"""
+        # A trailing space is kept: it asks for the next word
+        prefix = _SPACES.sub(" ", prefix.lower()).lstrip()
+        if not prefix:
+            return []
+        top = self._top.get(prefix)
+        if top is not None and k <= TOP_K:
+            numbers = top[:k]
+        else:
+            lo = bisect_left(self._keys, prefix)
+            hi = lo
+            while hi < len(self._keys) and self._keys[hi].startswith(prefix):
+                hi += 1
+            numbers = self._rank_range(lo, hi, k)
+        return [self.suggestions[number] for number in numbers]
@@ -0,0 +1,177 @@
+"""
+Query planner for wildcard searches.
+
+A wildcard query matches a field when the whole (lower-cased) field matches
+the glob, as with fnmatch, and scores 95 times the field weight. Rather than
+running fnmatch over every field of every item:
+
+- a prefix pattern such as `react*` is a range scan, found by bisection,
+  over a sorted index of field values (slugs, display names, tags, authors,
+  and the head of content and config);
+- any other glob is compiled to a regex once, and only run against items
+  whose indexed terms contain each literal run of the pattern, looked up
+  through the trigram index of SearchIndex. Patterns without a literal of
+  at least three characters are checked against every item.
+
+Only the sorted keys (value heads) of bodies are kept; full bodies are read
+from the catalog's ContentStore for the candidates a glob is checked against.
+"""
+
+import fnmatch
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.catalog import Catalog
+from app.services.fuzzy_scoring import LAZY_FIELDS, SEARCH_GROUPS, field_values
+from app.services.search_index import SearchIndex, tokenize
+
+# Relevance of a wildcard match, before field weights
+WILDCARD_SCORE = 95
+
+# Characters of each field kept in the sorted index; longer prefixes are
+# planned as generic globs
+KEY_LENGTH = 64
+
+# Fields that may hold a wildcard match, for any group
+FIELDS = ("name", "display_name", "tags", "author", "content", "config")
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> re.Pattern:
+    """Compile an fnmatch pattern once"""
+    return re.compile(fnmatch.translate(pattern))
+
+
+def star_matcher(pattern: str) -> Optional[Callable[[str], bool]]:
+    """Match `*`-only patterns with substring searches instead of a regex.
+
+    Returns None when the pattern uses `?` or character classes.
+    """
+    if '?' in pattern or '[' in pattern:
+        return None
+    if '*' not in pattern:
+        return lambda text: text == pattern
+    head, *middle, tail = pattern.split('*')
+
+    def matches(text: str) -> bool:
+        if not text.startswith(head):
+            return False
+        start = len(head)
+        end = len(text) - len(tail)
+        if end < start or not text.endswith(tail):
+            return False
+        for segment in middle:
+            found = text.find(segment, start, end)
+            if found < 0:
+                return False
+            start = found + len(segment)
+        return True
+
+    return matches
+
+
+def literal_prefix(pattern: str) -> Optional[str]:
+    """The literal part of a pure prefix pattern ("react*"), else None"""
+    if pattern.endswith('*'):
+        prefix = pattern.rstrip('*')
+        if not _GLOB_CHARS.search(prefix):
+            return prefix
+    return None
+
+
+class WildcardIndex:
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._types = [entry.action_type for entry in catalog.actions]
+        # Per-field values, lower-cased, by catalog position (bodies excepted)
+        self._values: Dict[str, List[List[str]]] = {field: [] for field in FIELDS if field not in LAZY_FIELDS}
+        keys: List[Tuple[str, int, str]] = []
+        for position, entry in enumerate(catalog.actions):
+            for field in FIELDS:
+                values = [value for value in field_values(catalog, entry, field) if value]
+                if field not in LAZY_FIELDS:
+                    self._values[field].append(values)
+                for value in values:
+                    keys.append((value[:KEY_LENGTH], position, field))
+        keys.sort()
+        self._keys = [key for key, _, _ in keys]
+        # Owner of each key as flat arrays rather than a tuple per key
+        self._key_positions = np.fromiter((position for _, position, _ in keys), dtype=np.int32, count=len(keys))
+        self._key_fields = np.fromiter((FIELDS.index(field) for _, _, field in keys), dtype=np.int8, count=len(keys))
+
+    def _field_values(self, field: str, position: int) -> List[str]:
+        if field in LAZY_FIELDS:
+            entry = self.catalog.actions[position]
+            return [value for value in field_values(self.catalog, entry, field) if value]
+        return self._values[field][position]
+
+    def _prefix_matches(self, prefix: str) -> Dict[int, Set[str]]:
+        """Fields whose value starts with prefix, by catalog position"""
+        matches: Dict[int, Set[str]] = {}
+        # Keys starting with prefix sort between prefix and prefix + the last code point
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+        positions = self._key_positions[start:end].tolist()
+        fields = self._key_fields[start:end].tolist()
+        for position, field in zip(positions, fields):
+            matches.setdefault(position, set()).add(FIELDS[field])
+        return matches
+
+    def _glob_matches(self, pattern: str, positions, weights: Dict[str, float]) -> Dict[int, float]:
+        """Best field weight matching the glob, among the given positions.
+
+        Fields are tried from the heaviest down and the first match wins, so
+        long content is only matched when nothing better did.
+        """
+        matches = star_matcher(pattern) or compile_glob(pattern).match
+        ordered = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+        best: Dict[int, float] = {}
+        for position in positions:
+            for field, weight in ordered:
+                if any(matches(value) for value in self._field_values(field, position)):
+                    best[position] = weight
+                    break
+        return best
+
+    def _candidates(self, pattern: str):
+        """Positions that can match pattern, or every position if the index can't tell"""
+        fragments = [token for literal in _GLOB_CHARS.split(pattern) for token in tokenize(literal)
+                     if len(token) >= 3]
+        if not fragments:
+            return range(len(self.catalog.actions))
+        index = self.catalog.artifact("search_index", SearchIndex)
+        # Rarest-looking (longest) fragment first, so the intersection shrinks fast
+        fragments.sort(key=len, reverse=True)
+        candidates = index.positions_containing(fragments[0])
+        for fragment in fragments[1:]:
+            if not candidates:
+                break
+            candidates &= index.positions_containing(fragment)
+        return sorted(candidates)
+
+    def search(self, pattern: str, group: str) -> List[Tuple[int, float]]:
+        """(position, relevance) of every item of a search group matching pattern"""
+        pattern = pattern.lower()
+        search_group = SEARCH_GROUPS[group]
+        weights = search_group.weights
+
+        types = self._types
+        prefix = literal_prefix(pattern)
+        if prefix is not None and len(prefix) < KEY_LENGTH:
+            best = {}
+            for position, fields in self._prefix_matches(prefix).items():
+                matched = [weight for field, weight in weights.items() if field in fields]
+                if matched and types[position] in search_group.action_types:
+                    best[position] = max(matched)
+        else:
+            positions = [position for position in self._candidates(pattern)
+                         if types[position] in search_group.action_types]
+            best = self._glob_matches(pattern, positions, weights)
+
+        return [(position, WILDCARD_SCORE * weight) for position, weight in sorted(best.items())]
@@ -0,0 +1,71 @@
+/**
+ * Streamed tool recommendations (/api/recommend/stream)
+ */
+
+// Progress line for a stage event, or null if the event is not worth showing
+function recommendationProgressMessage(event, data) {
+    if (event === 'stage' && data.stage === 'queue' && data.status === 'started' && data.depth > 0) {
+        return `Waiting for a free slot (${data.depth} ahead)...`;
+    }
+    if (event === 'stage' && data.stage === 'ingest') {
+        return data.status === 'started'
+            ? 'Ingesting repository...'
+            : `Repository ingested (${data.context_size.toLocaleString()} characters).`;
+    }
+    if (event === 'stage' && data.stage === 'llm' && data.status === 'started') {
+        return 'Choosing tools from the catalog...';
+    }
+    return null;
+}
+
+// POST a recommendation request and follow its server-sent events.
+// onEvent(event, data) is called for every event; resolves with the final
+// recommendation (the "preselection" event), rejects on an "error" event.
+async function streamRecommendation(body, onEvent) {
+    const response = await fetch('/api/recommend/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify(body)
+    });
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || 'Failed to get recommendations');
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    let result = null;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            if (!data) continue;  // Keepalive comment
+
+            const payload = JSON.parse(data);
+            if (event === 'error') {
+                throw new Error(payload.detail || 'Failed to get recommendations');
+            }
+            if (event === 'preselection') result = payload;
+            if (onEvent) onEvent(event, payload);
+        }
+    }
+
+    if (!result) throw new Error('Recommendation stream ended unexpectedly');
+    return result;
+}
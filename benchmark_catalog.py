@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Benchmarks for the action catalog on synthetic data.
+
+Usage:
+    python benchmark_catalog.py startup [--size 50000]
+    python benchmark_catalog.py memory [--size 20000]
+    python benchmark_catalog.py search [--sizes 1000 10000 100000]
+    python benchmark_catalog.py wildcard [--size 20000]
+"""
+
+import argparse
+import fnmatch
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import yaml
+from rapidfuzz import fuzz
+
+from app.models.actions import MCP, Action, ActionType, Agent, Rule
+from app.services import catalog_snapshot
+from app.services.actions_loader import ActionsLoader
+from app.services.fuzzy_scoring import FieldScorer, SEARCH_GROUPS
+from app.services.wildcard_search import WildcardIndex
+
+WORDS = [
+    "python", "react", "testing", "security", "docker", "typescript", "api", "database",
+    "performance", "linting", "documentation", "refactor", "async", "cache", "deploy",
+    "review", "style", "logging", "metrics", "migration", "frontend", "backend", "cli",
+]
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def write_synthetic_catalog(actions_dir: Path, size: int, seed: int = 42):
+    """Write agents/rules/mcps YAML files totalling `size` actions (20/75/5 split)"""
+    rng = random.Random(seed)
+    n_agents = size // 5
+    n_mcps = size // 20
+    n_rules = size - n_agents - n_mcps
+
+    agents = []
+    for i in range(n_agents):
+        agents.append({
+            "display_name": f"Agent {i}",
+            "slug": f"agent-{i}",
+            "tags": rng.sample(WORDS, 3),
+            "content": f"---\nname: agent-{i}\ndescription: {_sentence(rng, 20)}\n---\n\n{_sentence(rng, 150)}\n",
+        })
+
+    rules = {}
+    for i in range(n_rules):
+        slug = f"rule-{i}"
+        if i % 50 == 0 and i + 4 < n_rules:
+            rules[slug] = {
+                "display_name": f"Ruleset {i}",
+                "type": "ruleset",
+                "author": f"author-{i % 97}",
+                "tags": rng.sample(WORDS, 2),
+                "namespace": rng.choice(WORDS),
+                "children": [f"rule-{i + k}" for k in range(1, 5)],
+            }
+        else:
+            rules[slug] = {
+                "display_name": f"Rule {i}",
+                "type": "rule",
+                "author": f"author-{i % 97}",
+                "tags": rng.sample(WORDS, 3),
+                "namespace": rng.choice(WORDS),
+                "content": f"## Rule {i}\n\n- {_sentence(rng, 40)}\n- {_sentence(rng, 40)}\n",
+            }
+
+    mcps = []
+    for i in range(n_mcps):
+        mcps.append({
+            "display_name": f"MCP {i}",
+            "slug": f"mcp-{i}",
+            "description": _sentence(rng, 12),
+            "config": {"command": "npx", "args": ["-y", f"@example/mcp-{i}"], "env": {"TOKEN": f"${{MCP_{i}_TOKEN}}"}},
+        })
+
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    for filename, document in (("agents.yaml", {"agents": agents}), ("rules.yaml", rules), ("mcps.yaml", {"mcps": mcps})):
+        with open(actions_dir / filename, "w") as f:
+            yaml.dump(document, f, Dumper=dumper, allow_unicode=True, sort_keys=False)
+
+
+def _time_load(actions_dir: Path, use_snapshot: bool, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ActionsLoader(actions_dir, use_snapshot=use_snapshot)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_startup(size: int, repeat: int):
+    """Compare catalog load time: pure-Python YAML, libyaml and the compiled snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        actions_dir = Path(tmp)
+        write_synthetic_catalog(actions_dir, size)
+        yaml_bytes = sum((actions_dir / f).stat().st_size for f in ("agents.yaml", "rules.yaml", "mcps.yaml"))
+        print(f"Synthetic catalog: {size} actions, {yaml_bytes / 1e6:.1f} MB of YAML")
+
+        c_loader = catalog_snapshot.YamlLoader
+        catalog_snapshot.YamlLoader = yaml.SafeLoader
+        pure = _time_load(actions_dir, use_snapshot=False, repeat=1)
+        catalog_snapshot.YamlLoader = c_loader
+
+        libyaml = _time_load(actions_dir, use_snapshot=False, repeat=repeat)
+
+        ActionsLoader(actions_dir, use_snapshot=False).compile_snapshot()
+        snapshot_bytes = (actions_dir / catalog_snapshot.SNAPSHOT_FILENAME).stat().st_size
+        snapshot = _time_load(actions_dir, use_snapshot=True, repeat=repeat)
+
+        print(f"{'loader':<22}{'seconds':>10}{'speedup':>10}")
+        for label, seconds in (("yaml (pure python)", pure), ("yaml (libyaml)", libyaml),
+                               (f"snapshot ({snapshot_bytes / 1e6:.1f} MB)", snapshot)):
+            print(f"{label:<22}{seconds:>10.3f}{pure / seconds:>9.1f}x")
+
+
+def _build_pydantic_models(documents):
+    """The previous representation: a pydantic Action plus a legacy model per entry"""
+    actions, legacy = [], []
+    for agent_data in documents["agents"]["agents"]:
+        slug = agent_data.get("slug", "")
+        actions.append(Action(id=slug, name=slug, display_name=agent_data.get("display_name"),
+                              action_type=ActionType.AGENT, tags=agent_data.get("tags", []),
+                              content=agent_data.get("content"), filename=f"{slug}.md"))
+        legacy.append(Agent(name=slug, filename=f"{slug}.md", display_name=agent_data.get("display_name"),
+                            slug=slug, content=agent_data.get("content"), tags=agent_data.get("tags", [])))
+    for slug, rule_data in documents["rules"].items():
+        rule_type = ActionType.RULESET if rule_data.get("type") == "ruleset" else ActionType.RULE
+        actions.append(Action(id=slug, name=slug, display_name=rule_data.get("display_name"),
+                              action_type=rule_type, tags=rule_data.get("tags"), content=rule_data.get("content"),
+                              author=rule_data.get("author"), children=rule_data.get("children"),
+                              filename=f"{slug}.yaml", namespace=rule_data.get("namespace")))
+        legacy.append(Rule(name=slug, filename=f"{slug}.yaml", display_name=rule_data.get("display_name"),
+                           slug=slug, content=rule_data.get("content"), author=rule_data.get("author"),
+                           tags=rule_data.get("tags"), type=rule_data.get("type", "rule"),
+                           namespace=rule_data.get("namespace"), children=rule_data.get("children")))
+    for mcp_data in documents["mcps"]["mcps"]:
+        name = mcp_data.get("slug", "")
+        actions.append(Action(id=name, name=name, display_name=mcp_data.get("display_name"),
+                              action_type=ActionType.MCP, tags=mcp_data.get("tags", []),
+                              config=mcp_data.get("config", {}), description=mcp_data.get("description")))
+        legacy.append(MCP(name=name, config=mcp_data.get("config", {}), tags=mcp_data.get("tags", []),
+                          description=mcp_data.get("description")))
+    return actions, legacy
+
+
+def _build_catalog_entries(loader, documents):
+    """The current representation: one CatalogEntry per action, legacy shapes are views"""
+    return [entry for category in ("agents", "rules", "mcps")
+            for entry in getattr(loader, f"load_{category}")(documents[category])]
+
+
+def _retained_bytes(build) -> int:
+    """Bytes still allocated after build() returns, excluding the parsed documents"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def bench_memory(size: int):
+    """Compare bytes per action of the pydantic models and the slotted entries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        actions_dir = Path(tmp)
+        write_synthetic_catalog(actions_dir, size)
+        documents = {category: catalog_snapshot.load_yaml(actions_dir / f"{category}.yaml")
+                     for category in ("agents", "rules", "mcps")}
+        loader = ActionsLoader(actions_dir, use_snapshot=False)
+
+        # Bodies and other strings are shared with the parsed documents in both
+        # cases, so this measures per-action object overhead only
+        before = _retained_bytes(lambda: _build_pydantic_models(documents))
+        after = _retained_bytes(lambda: _build_catalog_entries(loader, documents))
+
+        print(f"Synthetic catalog: {size} actions")
+        print(f"{'representation':<32}{'MB':>8}{'bytes/action':>14}")
+        print(f"{'pydantic Action + legacy model':<32}{before / 1e6:>8.1f}{before / size:>14.0f}")
+        print(f"{'slotted CatalogEntry':<32}{after / 1e6:>8.1f}{after / size:>14.0f}")
+
+
+# Per-item scoring, the reference for the batched and wildcard paths
+
+
+def calculate_relevance(query: str, text: str) -> int:
+    """Calculate relevance score for fuzzy matching with wildcard support"""
+    if not text:
+        return 0
+    query_lower = query.lower()
+    text_lower = text.lower()
+
+    # Handle wildcard queries
+    if '*' in query or '?' in query:
+        if fnmatch.fnmatch(text_lower, query_lower):
+            return 95  # High score for wildcard matches
+        else:
+            return 0
+
+    # Exact match gets highest score
+    if query_lower == text_lower:
+        return 100
+
+    # Substring match gets high score
+    if query_lower in text_lower:
+        return 90
+
+    # Use fuzzy matching for partial matches
+    return fuzz.partial_ratio(query_lower, text_lower)
+
+
+def score_agent(query: str, agent) -> float:
+    name_score = calculate_relevance(query, agent.name)
+    display_score = calculate_relevance(query, agent.display_name or "")
+    content_score = calculate_relevance(query, agent.content or "") * 0.5  # Lower weight for content
+    return max(name_score, display_score, content_score)
+
+
+def score_rule(query: str, rule) -> float:
+    name_score = calculate_relevance(query, rule.name)
+    display_score = calculate_relevance(query, rule.display_name or "")
+    content_score = calculate_relevance(query, rule.content or "") * 0.5
+    author_score = calculate_relevance(query, rule.author or "") * 0.7
+
+    # Check tags
+    tag_score = 0
+    if rule.tags:
+        for tag in rule.tags:
+            tag_score = max(tag_score, calculate_relevance(query, tag))
+
+    return max(name_score, display_score, content_score, author_score, tag_score)
+
+
+def score_mcp(query: str, mcp) -> float:
+    name_score = calculate_relevance(query, mcp.name)
+    # Search in config (convert to string for searching)
+    config_score = calculate_relevance(query, str(mcp.config)) * 0.5
+    return max(name_score, config_score)
+
+
+LOOP_SCORERS = {"agents": score_agent, "rules": score_rule, "mcps": score_mcp}
+
+
+SEARCH_QUERIES = ["python", "securty", "react testing", "author-12", "rule-4242"]
+
+
+def bench_search(sizes, repeat: int):
+    """Compare per-item fuzzy scoring with the batched scorer over whole groups"""
+    print(f"{'actions':>8}{'loop ms':>12}{'batched ms':>12}{'speedup':>10}{'max diff':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            actions_dir = Path(tmp)
+            write_synthetic_catalog(actions_dir, size)
+            catalog = ActionsLoader(actions_dir, use_snapshot=False).catalog
+            groups = {"agents": catalog.get_agents(), "rules": catalog.get_rules(), "mcps": catalog.get_mcps()}
+            scorers = {name: FieldScorer(catalog, group) for name, group in SEARCH_GROUPS.items()}
+
+            loop_best = batched_best = float("inf")
+            max_diff = 0.0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                expected = {name: [[LOOP_SCORERS[name](query, item) for item in items] for query in SEARCH_QUERIES]
+                            for name, items in groups.items()}
+                loop_best = min(loop_best, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                actual = {name: [scorer.score(query, workers=-1)[1] for query in SEARCH_QUERIES]
+                          for name, scorer in scorers.items()}
+                batched_best = min(batched_best, time.perf_counter() - start)
+
+            for name in groups:
+                for loop_scores, batched_scores in zip(expected[name], actual[name]):
+                    if len(loop_scores):
+                        max_diff = max(max_diff, float(np.max(np.abs(np.array(loop_scores) - batched_scores))))
+
+            per_query = 1000 / len(SEARCH_QUERIES)
+            print(f"{size:>8}{loop_best * per_query:>12.1f}{batched_best * per_query:>12.1f}"
+                  f"{loop_best / batched_best:>9.1f}x{max_diff:>10.3f}")
+
+
+WILDCARD_QUERIES = ["rule-12*", "react*", "*securi*", "author-1?", "*test*ing*"]
+
+
+def bench_wildcard(size: int, repeat: int):
+    """Compare fnmatch over every field with the wildcard query planner"""
+    with tempfile.TemporaryDirectory() as tmp:
+        actions_dir = Path(tmp)
+        write_synthetic_catalog(actions_dir, size)
+        catalog = ActionsLoader(actions_dir, use_snapshot=False).catalog
+        groups = {"agents": catalog.get_agents(), "rules": catalog.get_rules(), "mcps": catalog.get_mcps()}
+        planner = WildcardIndex(catalog)
+
+        print(f"Synthetic catalog: {size} actions")
+        print(f"{'pattern':<14}{'matches':>9}{'scan ms':>10}{'planned ms':>12}{'speedup':>10}")
+        for pattern in WILDCARD_QUERIES:
+            scan_best = planned_best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                expected = {(name, item.name) for name, items in groups.items() for item in items
+                            if LOOP_SCORERS[name](pattern, item) > 30}
+                scan_best = min(scan_best, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                actual = {(name, catalog.actions[position].id) for name in groups
+                          for position, relevance in planner.search(pattern, name) if relevance > 30}
+                planned_best = min(planned_best, time.perf_counter() - start)
+
+            assert expected == actual, pattern
+            print(f"{pattern:<14}{len(actual):>9}{scan_best * 1000:>10.1f}{planned_best * 1000:>12.2f}"
+                  f"{scan_best / planned_best:>9.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    startup = subparsers.add_parser("startup", help="catalog load time")
+    startup.add_argument("--size", type=int, default=50000)
+    startup.add_argument("--repeat", type=int, default=3)
+
+    memory = subparsers.add_parser("memory", help="bytes per action")
+    memory.add_argument("--size", type=int, default=20000)
+
+    search = subparsers.add_parser("search", help="fuzzy scoring, per query over all groups")
+    search.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    search.add_argument("--repeat", type=int, default=3)
+
+    wildcard = subparsers.add_parser("wildcard", help="wildcard queries, scan vs planner")
+    wildcard.add_argument("--size", type=int, default=20000)
+    wildcard.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "startup":
+        bench_startup(args.size, args.repeat)
+    elif args.command == "memory":
+        bench_memory(args.size)
+    elif args.command == "search":
+        bench_search(args.sizes, args.repeat)
+    elif args.command == "wildcard":
+        bench_wildcard(args.size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 import yaml
 from pathlib import Path
 import json
+import sys
 
 def consolidate_agents():
     """Consolidate all agent YAML files into a single agents.yaml"""
@@ -100,13 +101,27 @@ def consolidate_mcps():
         return len(mcps_data)
     return 0
 
+def compile_snapshot():
+    """Compile the consolidated YAML files into app/actions/catalog.snapshot"""
+    from app.services.actions_loader import ActionsLoader
+    
+    loader = ActionsLoader(use_snapshot=False)
+    snapshot_path = loader.compile_snapshot()
+    print(f"Compiled {len(loader.actions)} actions into {snapshot_path.name}")
+    return snapshot_path
+
 def main():
     """Consolidate all actions into category files"""
+    if "--snapshot-only" in sys.argv:
+        compile_snapshot()
+        return
+    
     print("Starting consolidation...")
     
     agents_count = consolidate_agents()
     rules_count = consolidate_rules()
     mcps_count = consolidate_mcps()
+    compile_snapshot()
     
     print(f"\nConsolidation complete!")
     print(f"Total: {agents_count} agents, {rules_count} rules, {mcps_count} MCPs")
@@ -114,6 +129,7 @@ def main():
     print("  - app/actions/agents.yaml")
     print("  - app/actions/rules.yaml")
     print("  - app/actions/mcps.yaml")
+    print("  - app/actions/catalog.snapshot")
     print("\nNote: Original files have been preserved.")
     print("You can delete the individual files once the new system is verified.")
 
@@ -0,0 +1,26 @@
+from typing import List
+
+import pytest
+
+from tests.stub_server import Reply, StubServer
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def stub_server():
+    """Factory of started stub servers, stopped after the test"""
+    servers: List[StubServer] = []
+
+    async def start(*replies: Reply) -> StubServer:
+        server = StubServer(list(replies) or [Reply()])
+        await server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        await server.stop()
@@ -0,0 +1,63 @@
+"""Scripted local HTTP server for tests of outbound calls"""
+
+import asyncio
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Reply(NamedTuple):
+    status: int = 200
+    body: bytes = b"ok"
+    headers: Dict[str, str] = {}
+    delay: float = 0.0
+
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server answering with scripted replies.
+
+    Replies are used in order, the last one repeats. Counts connections and
+    requests so tests can tell pooled reuse and retries apart.
+    """
+
+    def __init__(self, replies: List[Reply]):
+        self.replies = list(replies)
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    name, _, value = line.partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+
+                reply = self.replies[min(self.requests, len(self.replies) - 1)]
+                self.requests += 1
+                if reply.delay:
+                    await asyncio.sleep(reply.delay)
+                headers = {"Content-Length": str(len(reply.body)), **reply.headers}
+                lines = [f"HTTP/1.1 {reply.status} Stub"] + [f"{k}: {v}" for k, v in headers.items()]
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + reply.body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
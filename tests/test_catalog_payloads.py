@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from app.services.actions_loader import ActionsLoader
+
+AGENTS = """
+agents:
+  - {slug: a-notags, content: x}
+  - {slug: a-emptytags, tags: [], content: x}
+  - {slug: a-nulltags, tags: null, content: x}
+  - {slug: a-tags, tags: [t1], display_name: A}
+"""
+RULES = """
+r-notags: {content: x}
+r-emptytags: {content: x, tags: []}
+r-tags: {content: x, tags: [t1], author: me}
+rs-nochildren: {type: ruleset}
+rs-emptychildren: {type: ruleset, children: []}
+rs-children: {type: ruleset, children: [r-tags]}
+"""
+MCPS = """
+mcps:
+  - {slug: m-noconfig}
+  - {slug: m-empty, tags: [], config: {}}
+  - {slug: m-full, tags: [t1], config: {command: x}, description: d}
+"""
+PACKS = """
+packs:
+  - {id: p-bare, name: P}
+  - {id: p-empty, name: P, tags: [], actions: []}
+  - {id: p-full, name: P, tags: [t1], actions: [r-tags], description: d}
+"""
+
+# (tags, children, config, description) of each Action, as the pydantic loader built them
+BASELINE_ACTIONS = {
+    "a-notags": ([], None, None, None),
+    "a-emptytags": ([], None, None, None),
+    "a-nulltags": (None, None, None, None),
+    "a-tags": (["t1"], None, None, None),
+    "r-notags": (None, None, None, None),
+    "r-emptytags": ([], None, None, None),
+    "r-tags": (["t1"], None, None, None),
+    "rs-nochildren": (None, None, None, None),
+    "rs-emptychildren": (None, [], None, None),
+    "rs-children": (None, ["r-tags"], None, None),
+    "m-noconfig": ([], None, {}, None),
+    "m-empty": ([], None, {}, None),
+    "m-full": (["t1"], None, {"command": "x"}, "d"),
+    "p-bare": ([], [], None, None),
+    "p-empty": ([], [], None, None),
+    "p-full": (["t1"], ["r-tags"], None, None),
+}
+
+BASELINE_LEGACY_FIELDS = {
+    "agents": ["content", "display_name", "filename", "name", "slug", "tags"],
+    "rules": ["author", "children", "content", "display_name", "filename", "name", "namespace", "slug",
+              "tags", "type"],
+    "mcps": ["config", "description", "name", "tags"],
+}
+
+
+@pytest.fixture(params=[False, True], ids=["yaml", "snapshot"])
+def catalog(request, tmp_path):
+    for filename, text in (("agents.yaml", AGENTS), ("rules.yaml", RULES),
+                           ("mcps.yaml", MCPS), ("packs.yaml", PACKS)):
+        (tmp_path / filename).write_text(text)
+    if request.param:
+        ActionsLoader(tmp_path, use_snapshot=False).compile_snapshot()
+    return ActionsLoader(tmp_path, use_snapshot=request.param).catalog
+
+
+def test_actions_keep_the_baseline_shape(catalog):
+    actions = {entry.id: catalog.to_action(entry).model_dump(mode="json") for entry in catalog.actions}
+    assert {
+        action_id: (action["tags"], action["children"], action["config"], action["description"])
+        for action_id, action in actions.items()
+    } == BASELINE_ACTIONS
+
+
+def test_legacy_views_keep_the_baseline_shape(catalog):
+    legacy = json.loads(json.dumps({group: [view.dict() for view in views]
+                                    for group, views in catalog.get_all().items()}))
+    for group, fields in BASELINE_LEGACY_FIELDS.items():
+        for item in legacy[group]:
+            assert sorted(item) == fields
+    tags = {item["name"]: item["tags"] for group in BASELINE_LEGACY_FIELDS for item in legacy[group]}
+    assert tags == {action_id: shape[0] for action_id, shape in BASELINE_ACTIONS.items()
+                    if not action_id.startswith("p-")}
+    children = {item["name"]: item["children"] for item in legacy["rules"]}
+    assert children == {action_id: shape[1] for action_id, shape in BASELINE_ACTIONS.items()
+                        if action_id.startswith("r")}
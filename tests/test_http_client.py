@@ -0,0 +1,188 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import http_client as http_client_module
+from app.services.http_client import ClientDisconnected, SharedHTTPClient, cancel_on_disconnect
+from tests.stub_server import Reply
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    # Keep jittered backoff short; Retry-After is still honored as sent
+    monkeypatch.setattr(http_client_module, "BACKOFF_BASE", 0.01)
+    client = SharedHTTPClient()
+    client.max_retries = 2
+    yield client
+    await client.aclose()
+
+
+async def test_requests_reuse_pooled_connection(client, stub_server):
+    server = await stub_server(Reply())
+    for _ in range(5):
+        response = await client.request("GET", f"{server.url}/ping")
+        assert response.status_code == 200
+    assert server.requests == 5
+    assert server.connections == 1
+
+
+async def test_concurrent_requests_share_the_pool(client, stub_server):
+    server = await stub_server(Reply(delay=0.05))
+    await asyncio.gather(*(client.request("GET", f"{server.url}/ping") for _ in range(4)))
+    # Parallel requests need parallel connections, later ones reuse them
+    await asyncio.gather(*(client.request("GET", f"{server.url}/ping") for _ in range(4)))
+    assert server.requests == 8
+    assert server.connections <= 4
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+async def test_retries_transient_statuses(client, stub_server, status):
+    server = await stub_server(Reply(status=status), Reply(status=status), Reply(body=b"done"))
+    response = await client.request("POST", f"{server.url}/v1/chat/completions", json={"a": 1})
+    assert response.status_code == 200
+    assert response.content == b"done"
+    assert server.requests == 3
+
+
+async def test_gives_up_after_max_retries(client, stub_server):
+    server = await stub_server(Reply(status=503))
+    response = await client.request("GET", f"{server.url}/busy")
+    # The last response is returned for the caller to raise_for_status()
+    assert response.status_code == 503
+    assert server.requests == 3
+
+
+async def test_max_retries_override(client, stub_server):
+    server = await stub_server(Reply(status=503))
+    response = await client.request("GET", f"{server.url}/busy", max_retries=0)
+    assert response.status_code == 503
+    assert server.requests == 1
+
+
+async def test_does_not_retry_client_errors(client, stub_server):
+    server = await stub_server(Reply(status=404))
+    response = await client.request("GET", f"{server.url}/missing")
+    assert response.status_code == 404
+    assert server.requests == 1
+
+
+async def test_honors_retry_after(client, stub_server):
+    server = await stub_server(Reply(status=429, headers={"Retry-After": "0.3"}), Reply())
+    started = time.monotonic()
+    response = await client.request("GET", f"{server.url}/limited")
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.3
+    assert server.requests == 2
+
+
+async def test_caps_retry_after(client, stub_server, monkeypatch):
+    monkeypatch.setattr(http_client_module, "BACKOFF_CAP", 0.1)
+    server = await stub_server(Reply(status=503, headers={"Retry-After": "3600"}), Reply())
+    started = time.monotonic()
+    response = await client.request("GET", f"{server.url}/limited")
+    assert response.status_code == 200
+    assert time.monotonic() - started < 1.0
+
+
+async def test_backoff_is_jittered_exponential(client, stub_server, monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def record_sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(http_client_module.asyncio, "sleep", record_sleep)
+    server = await stub_server(Reply(status=502), Reply(status=502), Reply())
+    await client.request("GET", f"{server.url}/flaky")
+    base = http_client_module.BACKOFF_BASE
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= base
+    assert 0 <= delays[1] <= base * 2
+
+
+async def test_timeout_is_retried_then_raised(client, stub_server):
+    server = await stub_server(Reply(delay=1.0))
+    with pytest.raises(httpx.TimeoutException):
+        await client.request("GET", f"{server.url}/slow", timeout=0.1, max_retries=1)
+    assert server.requests == 2
+
+
+async def test_timeout_then_success(client, stub_server):
+    server = await stub_server(Reply(delay=1.0), Reply(body=b"fast"))
+    response = await client.request("GET", f"{server.url}/slow", timeout=0.2)
+    assert response.content == b"fast"
+
+
+async def test_connection_error_raised_after_retries(client, stub_server):
+    server = await stub_server(Reply())
+    url = server.url
+    await server.stop()
+    with pytest.raises(httpx.ConnectError):
+        await client.request("GET", f"{url}/gone", max_retries=1)
+
+
+class FakeRequest:
+    """Stands in for a starlette Request that disconnects after a while"""
+
+    def __init__(self, disconnect_after: float):
+        self.url = SimpleNamespace(path="/api/recommend")
+        self._disconnect_at = time.monotonic() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self._disconnect_at
+
+
+async def test_cancel_on_disconnect_returns_result(monkeypatch):
+    monkeypatch.setattr(http_client_module, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    assert await cancel_on_disconnect(FakeRequest(disconnect_after=10), work()) == "result"
+
+
+async def test_cancel_on_disconnect_cancels_work(monkeypatch):
+    monkeypatch.setattr(http_client_module, "DISCONNECT_POLL_INTERVAL", 0.01)
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(FakeRequest(disconnect_after=0.05), work())
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+async def test_cancel_on_disconnect_propagates_errors(monkeypatch):
+    monkeypatch.setattr(http_client_module, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    async def work():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await cancel_on_disconnect(FakeRequest(disconnect_after=10), work())
+
+
+async def test_cancel_on_disconnect_aborts_upstream_request(client, stub_server, monkeypatch):
+    monkeypatch.setattr(http_client_module, "DISCONNECT_POLL_INTERVAL", 0.01)
+    server = await stub_server(Reply(delay=5.0))
+    started = time.monotonic()
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(
+            FakeRequest(disconnect_after=0.1),
+            client.request("GET", f"{server.url}/slow")
+        )
+    assert time.monotonic() - started < 1.0
+    assert server.requests == 1
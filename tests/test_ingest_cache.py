@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services import ingest_cache as ingest_cache_module
+from app.services.ingest_cache import IngestCache, UnsupportedRepository
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def resolved(monkeypatch):
+    """Records ls-remote calls instead of running git"""
+    calls = []
+    state = {"running": 0, "peak": 0}
+
+    async def fake_resolve_commit(url, ref="HEAD"):
+        calls.append((url, ref))
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.02)
+        state["running"] -= 1
+        return "0" * 40
+
+    monkeypatch.setattr(ingest_cache_module, "resolve_commit", fake_resolve_commit)
+    monkeypatch.setenv("INGEST_CACHE_PATH", "")
+    return calls, state
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/owner/repo",
+    "http://127.0.0.1:8080/owner/repo",
+    "https://github.com/owner",
+    "https://github.com.evil.test/owner/repo",
+])
+async def test_unsupported_repositories_never_reach_git(resolved, url):
+    calls, _ = resolved
+    cache = IngestCache()
+    with pytest.raises(UnsupportedRepository):
+        await cache.key_for(url)
+    assert calls == []
+
+
+async def test_supported_repository_is_resolved(resolved):
+    calls, _ = resolved
+    cache = IngestCache()
+    key = await cache.key_for("github.com/Owner/Repo.git/tree/main")
+    assert key == f"https://github.com/owner/repo@{'0' * 40}"
+    assert calls == [("https://github.com/owner/repo", "main")]
+
+
+async def test_ls_remote_concurrency_is_bounded(resolved, monkeypatch):
+    calls, state = resolved
+    monkeypatch.setattr(ingest_cache_module, "LS_REMOTE_CONCURRENCY", 3)
+    cache = IngestCache()
+    await asyncio.gather(*(cache.key_for(f"https://github.com/owner/repo-{i}") for i in range(12)))
+    assert len(calls) == 12
+    assert state["peak"] == 3
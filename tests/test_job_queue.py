@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes import recommend
+from app.services.job_queue import JobQueue, JobStore, QueueFull
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def queue(tmp_path):
+    queue = JobQueue("test", workers=1, max_depth=2, store=JobStore(tmp_path / "jobs.sqlite3", ttl=60))
+    yield queue
+    await queue.aclose()
+
+
+async def test_spawned_jobs_are_bounded(queue):
+    release = asyncio.Event()
+    jobs = [await queue.spawn(release.wait, 5, persist={}) for _ in range(queue.max_depth)]
+    with pytest.raises(QueueFull):
+        await queue.spawn(release.wait, 5, persist={})
+    assert queue.stats()["spawned"] == 2
+    assert queue.stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(*(job.future for job in jobs))
+    await asyncio.sleep(0)
+    assert queue.stats()["spawned"] == 0
+    await queue.spawn(release.wait, 5, persist={})
+
+
+async def test_concurrent_spawns_respect_the_bound(queue):
+    release = asyncio.Event()
+    results = await asyncio.gather(
+        *(queue.spawn(release.wait, 5, persist={}) for _ in range(20)),
+        return_exceptions=True
+    )
+    assert sum(not isinstance(result, QueueFull) for result in results) == queue.max_depth
+    release.set()
+
+
+async def test_create_job_responds_429_when_full(queue, monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_recommend(request, actions_catalog=None, schedule=None):
+        await release.wait()
+
+    monkeypatch.setattr(recommend, "recommend_jobs", queue)
+    monkeypatch.setattr(recommend, "_recommend", slow_recommend)
+    request = recommend.RecommendJobRequest(context="repository context")
+    for _ in range(queue.max_depth):
+        await recommend.create_recommend_job(request)
+    with pytest.raises(HTTPException) as error:
+        await recommend.create_recommend_job(request)
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) >= 1
+    release.set()
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import yaml
+
+from app.services.actions_loader import ActionsLoader
+from app.services.cache import LRUCache
+from app.services.search_service import SearchService
+
+
+def _catalog(actions_dir: Path, rules: dict):
+    actions_dir.mkdir()
+    (actions_dir / "agents.yaml").write_text(yaml.safe_dump({"agents": []}))
+    (actions_dir / "mcps.yaml").write_text(yaml.safe_dump({"mcps": []}))
+    (actions_dir / "rules.yaml").write_text(yaml.safe_dump(rules))
+    return ActionsLoader(actions_dir, use_snapshot=False).catalog
+
+
+class SwappingLoader:
+    """Serves a different catalog on every read, as a reload racing a query would"""
+
+    def __init__(self, *catalogs):
+        self.catalogs = catalogs
+        self.reads = 0
+
+    @property
+    def catalog(self):
+        catalog = self.catalogs[self.reads % len(self.catalogs)]
+        self.reads += 1
+        return catalog
+
+    def register_artifact(self, name, factory):
+        pass
+
+
+def test_search_uses_one_catalog_snapshot(tmp_path):
+    before = _catalog(tmp_path / "before", {
+        "python-style": {"content": "python style guide", "tags": ["python"]},
+        "python-testing": {"content": "python testing", "tags": ["python"]},
+    })
+    # Reordered and shrunk: positions of the first catalog point elsewhere or nowhere
+    after = _catalog(tmp_path / "after", {
+        "docker": {"content": "containers"},
+    })
+    service = SearchService.__new__(SearchService)
+    service.actions_loader = SwappingLoader(before, after)
+    service.cache = LRUCache(maxsize=16, ttl=60)
+
+    hits = service.search("python")
+    assert {hit["id"] for hit in hits} == {"python-style", "python-testing"}
+    assert service.actions_loader.reads == 1
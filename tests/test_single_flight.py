@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    assert await asyncio.gather(*(flights.do("key", work) for _ in range(5))) == [1] * 5
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flights.do("key", work))
+    joiner = asyncio.ensure_future(flights.do("key", work))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await joiner == "done"
+
+
+async def test_caller_after_cancellation_starts_a_new_call():
+    flights = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Winds down over a few iterations, as a closing upstream request would
+            await asyncio.sleep(0.01)
+            cancelled.set()
+            raise
+
+    async def fast():
+        return "fresh"
+
+    leader = asyncio.ensure_future(flights.do("key", slow))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # The cancelled call is still winding down
+    assert not cancelled.is_set()
+    assert await flights.do("key", fast) == "fresh"
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flights.stats()["in_flight"] == 0